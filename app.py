@@ -1,9 +1,25 @@
-import random
-from dataclasses import dataclass, field
-from typing import List, Dict, Tuple, Optional, Union
+import functools
+import os
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
 
 import streamlit as st
 
+from engine import (
+    Posting,
+    Ledger,
+    Question,
+    account_options_for_round,
+    mark,
+    diagnose,
+    annotate_with_from_to,
+    format_journal,
+)
+from engine import bank, profiling
+from engine.reconcile import reconcile
+from engine.memory import session_footprint
+from engine.store import SessionStore
+
 
 # ----------------------------
 # Visuals (safe CSS)
@@ -65,449 +81,84 @@ st.markdown(CSS, unsafe_allow_html=True)
 
 
 # ----------------------------
-# Models
+# App
 # ----------------------------
 
-@dataclass(frozen=True)
-class Posting:
-    account: str
-    side: str  # "DR" or "CR"
-    amount: int
-    narrative: str = ""
-
-
-@dataclass
-class LedgerAccount:
-    name: str
-    debits: List[Tuple[str, int]] = field(default_factory=list)   # (narrative, amount)
-    credits: List[Tuple[str, int]] = field(default_factory=list)
-
-    def post(self, side: str, amount: int, narrative: str = "") -> None:
-        s = side.upper().strip()
-        if s == "DR":
-            self.debits.append((narrative, amount))
-        elif s == "CR":
-            self.credits.append((narrative, amount))
-        else:
-            raise ValueError("Side must be DR or CR")
-
-    def totals(self) -> Tuple[int, int]:
-        return sum(a for _, a in self.debits), sum(a for _, a in self.credits)
-
-    def balance(self) -> Tuple[str, int]:
-        dr, cr = self.totals()
-        if dr > cr:
-            return "DR", dr - cr
-        if cr > dr:
-            return "CR", cr - dr
-        return "", 0
-
-
-class Ledger:
-    def __init__(self) -> None:
-        self.accounts: Dict[str, LedgerAccount] = {}
-
-    def get(self, name: str) -> LedgerAccount:
-        key = name.strip()
-        if key not in self.accounts:
-            self.accounts[key] = LedgerAccount(name=key)
-        return self.accounts[key]
-
-    def post_many(self, postings: List[Posting]) -> None:
-        for p in postings:
-            self.get(p.account).post(p.side, p.amount, p.narrative)
-
-    def used_account_names(self) -> List[str]:
-        names: List[str] = []
-        for n, a in self.accounts.items():
-            if a.debits or a.credits:
-                names.append(n)
-        return sorted(names)
-
-    def trial_balance_rows(self) -> List[Dict[str, Union[str, int]]]:
-        rows: List[Dict[str, Union[str, int]]] = []
-        for name in self.used_account_names():
-            side, amt = self.accounts[name].balance()
-            dr = amt if side == "DR" else 0
-            cr = amt if side == "CR" else 0
-            rows.append({"Account": name, "Debit (£)": int(dr), "Credit (£)": int(cr)})
-
-        total_dr = sum(int(r["Debit (£)"]) for r in rows) if rows else 0
-        total_cr = sum(int(r["Credit (£)"]) for r in rows) if rows else 0
-        rows.append({"Account": "TOTAL", "Debit (£)": int(total_dr), "Credit (£)": int(total_cr)})
-        return rows
-
-    def t_account_table_rows(self, name: str, include_balance_lines: bool = True) -> List[Dict[str, Union[str, int]]]:
-        # IMPORTANT: using get() makes this safe even if an account doesn't exist yet
-        acc = self.get(name)
-
-        dr_total, cr_total = acc.totals()
-        bal_side, bal_amt = acc.balance()
-
-        debits = list(acc.debits)
-        credits = list(acc.credits)
-
-        rows: List[Dict[str, Union[str, int]]] = []
-        max_len = max(len(debits), len(credits))
-
-        for i in range(max_len):
-            dr_ref, dr_amt = ("", "")
-            cr_ref, cr_amt = ("", "")
-
-            if i < len(debits):
-                dr_ref, a = debits[i]
-                dr_amt = a
-            if i < len(credits):
-                cr_ref, a = credits[i]
-                cr_amt = a
-
-            rows.append({
-                "Debit (ref)": dr_ref,
-                "Debit (£)": dr_amt,
-                "Credit (ref)": cr_ref,
-                "Credit (£)": cr_amt
-            })
-
-        if include_balance_lines and bal_side and bal_amt:
-            if bal_side == "DR":
-                rows.append({"Debit (ref)": "", "Debit (£)": "", "Credit (ref)": "Bal c/d", "Credit (£)": bal_amt})
-                cr_total += bal_amt
-            else:
-                rows.append({"Debit (ref)": "Bal c/d", "Debit (£)": bal_amt, "Credit (ref)": "", "Credit (£)": ""})
-                dr_total += bal_amt
-
-        rows.append({
-            "Debit (ref)": "Total",
-            "Debit (£)": dr_total,
-            "Credit (ref)": "Total",
-            "Credit (£)": cr_total
-        })
-
-        if include_balance_lines and bal_side and bal_amt:
-            if bal_side == "DR":
-                rows.append({"Debit (ref)": "Bal b/d", "Debit (£)": bal_amt, "Credit (ref)": "", "Credit (£)": ""})
-            else:
-                rows.append({"Debit (ref)": "", "Debit (£)": "", "Credit (ref)": "Bal b/d", "Credit (£)": bal_amt})
-
-        return rows
-
-
-# ----------------------------
-# Questions
-# ----------------------------
+st.set_page_config(page_title="Double Entry Game", layout="wide")
 
-@dataclass(frozen=True)
-class Question:
-    prompt: str
-    expected: List[Posting]
-
-
-def _p(account: str, side: str, amount: int) -> Posting:
-    return Posting(account=account, side=side, amount=amount, narrative="")
-
-
-def build_round(round_no: int, n: int = 10) -> List[Question]:
-    rng = random.Random(1000 + round_no)
-    vat_rate = 20
-
-    A = {
-        "BANK": "Bank",
-        "CAP": "Capital",
-        "DRAW": "Drawings",
-        "SALES": "Sales",
-        "PUR": "Purchases",
-        "RENT": "Rent expense",
-        "WAGES": "Wages expense",
-        "UTIL": "Utilities expense",
-        "EQUIP": "Equipment",
-        "AR": "Trade receivables",
-        "AP": "Trade payables",
-        "RET_IN": "Sales returns",
-        "RET_OUT": "Purchase returns",
-        "VAT_IN": "VAT input",
-        "VAT_OUT": "VAT output",
-        "DISC_REC": "Discount received",
-        "DISC_ALL": "Discount allowed",
-        "DEP": "Depreciation expense",
-        "ACCDEP": "Accumulated depreciation",
-        "BAD": "Bad debt expense",
-        "ALLOW": "Allowance for doubtful debts",
-        "ACCR": "Accruals",
-        "PREP": "Prepayments",
-        "SUSP": "Suspense",
-    }
-
-    def amt(lo: int, hi: int, step: int = 100) -> int:
-        return rng.randrange(lo, hi + step, step)
-
-    def add_vat(net: int) -> Tuple[int, int, int]:
-        vat = (net * vat_rate) // 100
-        gross = net + vat
-        return net, vat, gross
-
-    diff = round_no
-    templates = []
-
-    if diff <= 4:
-        templates = [
-            ("Owner introduced funds into the business £{x}.",
-             lambda x: [_p(A["BANK"], "DR", x), _p(A["CAP"], "CR", x)]),
-            ("Paid rent from bank £{x}.",
-             lambda x: [_p(A["RENT"], "DR", x), _p(A["BANK"], "CR", x)]),
-            ("Paid wages from bank £{x}.",
-             lambda x: [_p(A["WAGES"], "DR", x), _p(A["BANK"], "CR", x)]),
-            ("Bought equipment and paid immediately by bank £{x}.",
-             lambda x: [_p(A["EQUIP"], "DR", x), _p(A["BANK"], "CR", x)]),
-            ("Made a sale and received the money in bank £{x}.",
-             lambda x: [_p(A["BANK"], "DR", x), _p(A["SALES"], "CR", x)]),
-        ]
-    elif diff <= 8:
-        templates = [
-            ("Sold goods on credit £{x}.",
-             lambda x: [_p(A["AR"], "DR", x), _p(A["SALES"], "CR", x)]),
-            ("Bought goods on credit £{x}.",
-             lambda x: [_p(A["PUR"], "DR", x), _p(A["AP"], "CR", x)]),
-            ("Customer returned goods worth £{x}.",
-             lambda x: [_p(A["RET_IN"], "DR", x), _p(A["AR"], "CR", x)]),
-            ("Returned goods to supplier worth £{x}.",
-             lambda x: [_p(A["AP"], "DR", x), _p(A["RET_OUT"], "CR", x)]),
-            ("Received money from a customer into bank £{x}.",
-             lambda x: [_p(A["BANK"], "DR", x), _p(A["AR"], "CR", x)]),
-            ("Paid a supplier from bank £{x}.",
-             lambda x: [_p(A["AP"], "DR", x), _p(A["BANK"], "CR", x)]),
-        ]
-    elif diff <= 12:
-        templates = [
-            ("Bought utilities, net £{x} plus VAT 20%, paid by bank.",
-             lambda x: (lambda net, vat, gross: [
-                 _p(A["UTIL"], "DR", net),
-                 _p(A["VAT_IN"], "DR", vat),
-                 _p(A["BANK"], "CR", gross)
-             ])(*add_vat(x))),
-            ("Made a credit sale, net £{x} plus VAT 20%.",
-             lambda x: (lambda net, vat, gross: [
-                 _p(A["AR"], "DR", gross),
-                 _p(A["SALES"], "CR", net),
-                 _p(A["VAT_OUT"], "CR", vat)
-             ])(*add_vat(x))),
-            ("Bought goods on credit, net £{x} plus VAT 20%.",
-             lambda x: (lambda net, vat, gross: [
-                 _p(A["PUR"], "DR", net),
-                 _p(A["VAT_IN"], "DR", vat),
-                 _p(A["AP"], "CR", gross)
-             ])(*add_vat(x))),
-            ("Record depreciation for the period £{x}.",
-             lambda x: [_p(A["DEP"], "DR", x), _p(A["ACCDEP"], "CR", x)]),
-            ("Allowed a customer discount £{x}.",
-             lambda x: [_p(A["DISC_ALL"], "DR", x), _p(A["AR"], "CR", x)]),
-            ("Received a supplier discount £{x}.",
-             lambda x: [_p(A["AP"], "DR", x), _p(A["DISC_REC"], "CR", x)]),
-        ]
-    elif diff <= 16:
-        templates = [
-            ("At period end, rent of £{x} is owing (accrual).",
-             lambda x: [_p(A["RENT"], "DR", x), _p(A["ACCR"], "CR", x)]),
-            ("At period end, utilities of £{x} were paid in advance (prepayment).",
-             lambda x: [_p(A["PREP"], "DR", x), _p(A["UTIL"], "CR", x)]),
-            ("Write off an irrecoverable debt £{x}.",
-             lambda x: [_p(A["BAD"], "DR", x), _p(A["AR"], "CR", x)]),
-            ("Create an allowance for doubtful debts £{x}.",
-             lambda x: [_p(A["BAD"], "DR", x), _p(A["ALLOW"], "CR", x)]),
-            ("Owner took drawings £{x} from bank.",
-             lambda x: [_p(A["DRAW"], "DR", x), _p(A["BANK"], "CR", x)]),
-        ]
-    else:
-        templates = [
-            ("Correct this error: equipment £{x} was wrongly debited to purchases.",
-             lambda x: [_p(A["EQUIP"], "DR", x), _p(A["PUR"], "CR", x)]),
-            ("A one sided error: bank was credited £{x} but the debit entry was missing. Use suspense.",
-             lambda x: [_p(A["SUSP"], "DR", x), _p(A["BANK"], "CR", x)]),
-            ("Clear suspense: the missing debit was rent expense £{x}.",
-             lambda x: [_p(A["RENT"], "DR", x), _p(A["SUSP"], "CR", x)]),
-            ("Customer pays £{x} and we allow a discount of £{d}.",
-             lambda x: (lambda disc: [
-                 _p(A["BANK"], "DR", x),
-                 _p(A["DISC_ALL"], "DR", disc),
-                 _p(A["AR"], "CR", x + disc)
-             ])(max(50, x // 10))),
-            ("We pay a supplier £{x} and receive a discount of £{d}.",
-             lambda x: (lambda disc: [
-                 _p(A["AP"], "DR", x + disc),
-                 _p(A["BANK"], "CR", x),
-                 _p(A["DISC_REC"], "CR", disc)
-             ])(max(50, x // 10))),
-        ]
-
-    questions: List[Question] = []
-    for i in range(n):
-        temp, builder = rng.choice(templates)
-
-        if diff <= 4:
-            x = amt(200, 3000, 100)
-        elif diff <= 8:
-            x = amt(300, 6000, 100)
-        elif diff <= 12:
-            x = amt(500, 10000, 100)
-        elif diff <= 16:
-            x = amt(200, 8000, 100)
-        else:
-            x = amt(500, 12000, 100)
+# Per-rerun profiling is a no-op unless ENGINE_PROFILE=1 or an admin turns it on.
+# If an on_click callback already began this rerun's capture, it is kept.
+def _begin_capture(begin) -> None:
+    begin(
+        "rerun",
+        cprofile=st.session_state.get("prof_cprofile", False),
+        memory=st.session_state.get("prof_memory", False),
+    )
 
-        d = max(50, x // 10)
-        prompt = f"Q{i+1}. " + temp.format(x=x, d=d)
-        expected = builder(x)
-        questions.append(Question(prompt=prompt, expected=expected))
 
-    return questions
+_begin_capture(profiling.begin_rerun)
+profiling.count("script.run")
 
 
-# ----------------------------
-# Dropdown options
-# ----------------------------
+def _finish_rerun() -> None:
+    prof = profiling.end_rerun()
+    if prof is not None:
+        st.session_state.prof_last = prof
 
-def account_options_for_round(round_no: int) -> List[str]:
-    base = [
-        "Bank", "Capital", "Drawings", "Sales", "Purchases",
-        "Rent expense", "Wages expense", "Utilities expense", "Equipment",
-        "Trade receivables", "Trade payables",
-        "Sales returns", "Purchase returns",
-    ]
-    vat = ["VAT input", "VAT output"]
-    discounts = ["Discount allowed", "Discount received"]
-    adjustments = [
-        "Accruals", "Prepayments", "Depreciation expense", "Accumulated depreciation",
-        "Bad debt expense", "Allowance for doubtful debts"
-    ]
-    suspense = ["Suspense"]
-
-    if round_no <= 4:
-        return base
-    if round_no <= 8:
-        return base
-    if round_no <= 12:
-        return base + vat + discounts + ["Depreciation expense", "Accumulated depreciation"]
-    if round_no <= 16:
-        return base + vat + discounts + adjustments
-    return base + vat + discounts + adjustments + suspense
-
-
-def amount_options(expected: List[Posting], rng: random.Random) -> List[int]:
-    correct = sorted(set(p.amount for p in expected))
-    distractors: List[int] = []
-    for a in correct:
-        for delta in (50, 100, 200):
-            if a - delta > 0:
-                distractors.append(a - delta)
-            distractors.append(a + delta)
-
-    if correct:
-        lo = max(50, min(correct) - 500)
-        hi = max(correct) + 500
-        for _ in range(3):
-            distractors.append(rng.randrange(lo, hi + 50, 50))
-
-    merged = sorted(set(correct + distractors))
-    return merged[:18]
 
+def _stop() -> None:
+    _finish_rerun()
+    st.stop()
 
-# ----------------------------
-# Marking + hints
-# ----------------------------
 
-def canonical(postings: List[Posting]) -> List[Tuple[str, str, int]]:
-    return sorted((p.account.strip(), p.side.upper().strip(), p.amount) for p in postings)
+st.markdown('<div class="big-title">Double Entry Game</div>', unsafe_allow_html=True)
+st.markdown('<div class="subtitle">Dropdown journal entry. Live balancing. Responsive T accounts. Trial balance at the end.</div>', unsafe_allow_html=True)
 
+# Question bank is shared by every session in this process; build all rounds once at server start.
+@st.cache_resource
+def _prebuilt_bank() -> int:
+    return bank.prebuild()
 
-def mark(student: List[Posting], expected: List[Posting]) -> Tuple[bool, str]:
-    s = canonical(student)
-    e = canonical(expected)
-    if s == e:
-        return True, ""
 
-    s_set = set(s)
-    e_set = set(e)
+_prebuilt_bank()
 
-    missing = sorted(list(e_set - s_set))
-    extra = sorted(list(s_set - e_set))
+# Durable progress: one SQLite store per server process, keyed by a session id kept in the URL.
+@st.cache_resource
+def _session_store() -> SessionStore:
+    return SessionStore(os.environ.get("GAME_DB", "game_sessions.sqlite3"))
 
-    lines: List[str] = []
-    if missing:
-        lines.append("Missing lines")
-        for a, side, amt in missing:
-            lines.append(f"{side} {a} {amt:,}")
-    if extra:
-        lines.append("Incorrect extra lines")
-        for a, side, amt in extra:
-            lines.append(f"{side} {a} {amt:,}")
 
-    return False, "\n".join(lines)
+store = _session_store()
 
+PERSISTED_KEYS = [
+    "started", "round_no", "q_index", "score", "attempts",
+    "last_message", "last_feedback", "last_journal", "last_correct",
+    "current_q_index", "lines",
+]
 
-def generate_hint(student: List[Posting], expected: List[Posting]) -> Optional[str]:
-    s_acc = sorted([p.account for p in student])
-    e_acc = sorted([p.account for p in expected])
 
-    if sorted(set(s_acc)) == sorted(set(e_acc)):
-        s_pairs = sorted((p.account, p.side) for p in student)
-        e_pairs = sorted((p.account, p.side) for p in expected)
-        if sorted(set(a for a, _ in s_pairs)) == sorted(set(a for a, _ in e_pairs)) and s_pairs != e_pairs:
-            return "Hint: You have the right accounts, but one or more are on the wrong side (Dr or Cr)."
-        return "Hint: The right accounts are there, but check amounts and whether VAT or discounts are treated correctly."
+def _progress() -> Dict[str, Any]:
+    return {k: st.session_state.get(k) for k in PERSISTED_KEYS}
 
-    e_has_vat = any("VAT" in p.account for p in expected)
-    s_has_vat = any("VAT" in p.account for p in student)
-    if e_has_vat and not s_has_vat:
-        return "Hint: This looks like a VAT question. Are you missing VAT input or VAT output?"
 
-    return None
+def _persist(postings: Optional[List[Posting]] = None) -> None:
+    store.record(sid, _progress(), postings or [], st.session_state.get("ledger"))
 
 
-# ----------------------------
-# Narratives: show from/to contra accounts
-# ----------------------------
+# Closed periods of continuous play are archived here, one JSONL file per session.
+ARCHIVE_DIR = os.environ.get("GAME_ARCHIVE_DIR", "game_archive")
 
-def _compact(accounts: List[str], limit: int = 2) -> str:
-    uniq: List[str] = []
-    for a in accounts:
-        if a not in uniq:
-            uniq.append(a)
-    if not uniq:
-        return ""
-    if len(uniq) <= limit:
-        return " & ".join(uniq)
-    return "Various"
-
-
-def annotate_with_from_to(postings: List[Posting], q_no: int) -> List[Posting]:
-    debits = [p.account for p in postings if p.side.upper() == "DR"]
-    credits = [p.account for p in postings if p.side.upper() == "CR"]
-
-    cr_text = _compact(credits)
-    dr_text = _compact(debits)
-
-    out: List[Posting] = []
-    for p in postings:
-        side = p.side.upper()
-        if side == "DR":
-            nar = f"Q{q_no} from {cr_text}" if cr_text else f"Q{q_no}"
-        else:
-            nar = f"Q{q_no} to {dr_text}" if dr_text else f"Q{q_no}"
-        out.append(Posting(account=p.account, side=side, amount=p.amount, narrative=nar))
-    return out
 
+def _archive_path() -> str:
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    safe = "".join(c for c in sid if c.isalnum())[:64] or "session"
+    return os.path.join(ARCHIVE_DIR, f"{safe}.jsonl")
 
-def format_journal(postings: List[Posting]) -> str:
-    return "\n".join(f"{p.side.title()} {p.account} {p.amount:,}" for p in postings)
 
-
-# ----------------------------
-# App
-# ----------------------------
-
-st.set_page_config(page_title="Double Entry Game", layout="wide")
-
-st.markdown('<div class="big-title">Double Entry Game</div>', unsafe_allow_html=True)
-st.markdown('<div class="subtitle">Dropdown journal entry. Live balancing. Responsive T accounts. Trial balance at the end.</div>', unsafe_allow_html=True)
+sid = st.query_params.get("sid", "")
+if not sid:
+    sid = uuid.uuid4().hex
+    st.query_params["sid"] = sid
 
 # Session defaults
 defaults = {
@@ -526,75 +177,320 @@ for k, v in defaults.items():
     if k not in st.session_state:
         st.session_state[k] = v
 
-# SELF-HEAL: if started=True but core objects missing (common after deploy), reset safely
-required_when_started = ["round_no", "questions", "ledger", "q_index", "score", "attempts"]
+# RESTORE: a fresh browser session (or one emptied by a deploy) picks up its saved game
+required_when_started = ["round_no", "ledger", "q_index", "score", "attempts"]
+if not st.session_state.get("restored", False):
+    st.session_state.restored = True
+    with profiling.section("page.restore"):
+        saved = store.load(sid)
+    if saved is not None and saved.state.get("started"):
+        for k, v in saved.state.items():
+            st.session_state[k] = v
+        st.session_state.ledger = saved.ledger
+
+# SELF-HEAL: if started=True but core objects are still missing, reset safely
 if st.session_state.get("started", False):
     missing = [k for k in required_when_started if k not in st.session_state]
     if missing:
         st.session_state.started = False
         st.warning("The app refreshed and the game state was reset. Please click Start new round.")
 
+# ----------------------------
+# Admin: profiling panel
+# ----------------------------
+# Shown only when GAME_ADMIN_TOKEN is set and the URL carries ?admin=<token>.
+
+ADMIN_TOKEN = os.environ.get("GAME_ADMIN_TOKEN", "")
+is_admin = bool(ADMIN_TOKEN) and st.query_params.get("admin", "") == ADMIN_TOKEN
+
+
+def profiling_panel() -> None:
+    with st.expander("Profiling", expanded=False):
+        on = st.toggle("Instrumentation (all sessions)", value=profiling.ENABLED)
+        if on != profiling.ENABLED:
+            profiling.enable(on)
+        st.checkbox("cProfile each rerun", key="prof_cprofile")
+        st.checkbox("tracemalloc each rerun", key="prof_memory")
+
+        last = st.session_state.get("prof_last")
+        if last is not None:
+            st.caption(f"Previous rerun: {last.total_s * 1e3:.1f} ms")
+            names = sorted(last.sections, key=last.sections.get, reverse=True)
+            st.dataframe(
+                {"Section": names, "ms": [round(last.sections[n] * 1e3, 2) for n in names]},
+                use_container_width=True, hide_index=True,
+            )
+            if last.counters:
+                st.caption(", ".join(f"{k} {v}" for k, v in sorted(last.counters.items())))
+            if last.cprofile_text:
+                st.code(last.cprofile_text, language="text")
+            if last.memory_top:
+                st.caption(f"Traced peak {last.memory_peak_bytes / 1024:,.0f} KiB")
+                st.code("\n".join(last.memory_top), language="text")
+
+        timers = profiling.snapshot()["timers"]
+        if timers:
+            st.markdown("**Since start-up**")
+            st.dataframe(
+                {
+                    "Timer": list(timers),
+                    "Calls": [t["count"] for t in timers.values()],
+                    "Mean ms": [round(t["total_s"] / t["count"] * 1e3, 3) for t in timers.values()],
+                    "Max ms": [round(t["max_s"] * 1e3, 3) for t in timers.values()],
+                },
+                use_container_width=True, hide_index=True,
+            )
+        st.download_button("Prometheus metrics", profiling.prometheus_text(), file_name="engine_metrics.prom")
+        if profiling.LOG_PATH:
+            st.caption(f"Rerun log: {profiling.LOG_PATH}")
+        if st.button("Reset timers"):
+            profiling.reset()
+
+        if st.checkbox("Measure this session's memory", key="prof_session_size"):
+            sizes = session_footprint(st.session_state.to_dict())
+            total = sizes.pop("total")
+            keys = sorted(sizes, key=sizes.get, reverse=True)[:15]
+            st.caption(f"Session state: {total / 1024:,.1f} KiB in {len(sizes)} keys")
+            st.dataframe(
+                {"Key": keys, "KiB": [round(sizes[k] / 1024, 2) for k in keys]},
+                use_container_width=True, hide_index=True,
+            )
+
+
+# ----------------------------
+# Actions (on_click callbacks)
+# ----------------------------
+# Start round, reset, submit and show answer change state in their callback,
+# which Streamlit runs before the script. The script then renders the new
+# state, so each action costs one script run and never needs st.rerun().
+# Callbacks read the journal from the widget keys in session_state.
+
+Row = Tuple[str, str, int]
+GRID_COLUMNS = ("Side", "Account", "Amount (£)")
+
+
+def _totals(rows: List[Row]) -> Tuple[int, int]:
+    dr_total = sum(a for s, _, a in rows if s == "DR")
+    cr_total = sum(a for s, _, a in rows if s == "CR")
+    return dr_total, cr_total
+
+
+def _dropdown_rows(round_no: int, q_index: int) -> List[Row]:
+    ss = st.session_state
+    rows: List[Row] = []
+    for i in range(ss.lines):
+        side = ss.get(f"side_{round_no}_{q_index}_{i}", "DR")
+        account = ss.get(f"acct_{round_no}_{q_index}_{i}", "")
+        amount = ss.get(f"amt_{round_no}_{q_index}_{i}", 0)
+        if account and amount > 0:
+            rows.append((side, account, amount))
+    return rows
+
+
+def _grid_rows(round_no: int, q_index: int) -> List[Row]:
+    # The grid's session_state value is its edit delta against the blank grid.
+    edits = st.session_state.get(f"grid_{round_no}_{q_index}_journal") or {}
+    blank = dict(zip(GRID_COLUMNS, ("DR", None, None)))
+    table = [dict(blank) for _ in range(st.session_state.lines)]
+    for i, change in edits.get("edited_rows", {}).items():
+        table[int(i)].update(change)
+    deleted = {int(i) for i in edits.get("deleted_rows", [])}
+    table = [r for i, r in enumerate(table) if i not in deleted]
+    table += [{**blank, **r} for r in edits.get("added_rows", [])]
+
+    rows: List[Row] = []
+    for r in table:
+        side, account, amount = (r.get(c) for c in GRID_COLUMNS)
+        if account and amount:
+            rows.append((side or "DR", account, int(amount)))
+    return rows
+
+
+def _action(fn):
+    # Callbacks run before the script body; start the rerun's capture here so
+    # marking and posting show up in its breakdown, timed as "action.<name>".
+    name = f"action.{fn.__name__.removeprefix('_on_')}"
+
+    @functools.wraps(fn)
+    def run(*args):
+        _begin_capture(profiling.begin_callback)
+        with profiling.section(name):
+            return fn(*args)
+
+    return run
+
+
+def _is_current(round_no: int, q_index: int) -> bool:
+    # A click from a page drawn before the question moved on is ignored.
+    ss = st.session_state
+    return bool(ss.get("started")) and ss.get("round_no") == round_no and ss.get("q_index") == q_index
+
+
+def _post_and_advance(q_index: int, postings: List[Posting]) -> None:
+    posted = annotate_with_from_to(postings, q_index + 1)
+    st.session_state.ledger.post_many(posted)
+    st.session_state.q_index += 1
+    st.session_state.attempts = 0
+    _persist(posted)
+
+
+@_action
+def _on_start() -> None:
+    ss = st.session_state
+    ledger = ss.get("ledger")
+    if ss.get("carry_books") and ss.started and ledger is not None:
+        ss.last_close = ledger.close_period(archive=_archive_path(), label=f"Round {ss.round_no}")
+    else:
+        ledger = Ledger()
+        ss.last_close = None
+
+    ss.started = True
+    ss.round_no = int(ss.round_choice)
+    ss.q_index = 0
+    ss.score = 0
+    ss.attempts = 0
+    ss.ledger = ledger
+
+    ss.last_message = ""
+    ss.last_feedback = ""
+    ss.last_journal = ""
+    ss.lines = 2
+    ss.last_correct = None
+    ss.current_q_index = -1
+
+    store.start(sid, _progress(), ledger)
+    profiling.count("round.start")
+
+
+@_action
+def _on_reset() -> None:
+    store.delete(sid)
+    for k in list(st.session_state.keys()):
+        del st.session_state[k]
+
+
+@_action
+def _on_submit(round_no: int, q_index: int, grid: bool) -> None:
+    if not _is_current(round_no, q_index):
+        return
+    ss = st.session_state
+    q = bank.get_round(round_no).questions[q_index]
+    rows = _grid_rows(round_no, q_index) if grid else _dropdown_rows(round_no, q_index)
+    dr_total, cr_total = _totals(rows)
+
+    profiling.count("submit")
+    if not rows:
+        ss.last_correct = False
+        ss.last_message = "Not marked. Please select at least two lines with accounts and amounts."
+        ss.last_feedback = ""
+        return
+    if dr_total != cr_total:
+        ss.last_correct = False
+        ss.last_message = "Not marked. Your entry must balance before you submit."
+        ss.last_feedback = ""
+        return
+
+    student_postings = [Posting(account=a, side=s, amount=amt, narrative="") for (s, a, amt) in rows]
+    ok, feedback = mark(student_postings, q.answer_key)
+
+    if ok:
+        profiling.count("submit.correct")
+        ss.score += 1
+        ss.last_correct = True
+        ss.last_message = "Correct"
+        ss.last_feedback = ""
+        ss.last_journal = format_journal(student_postings)
+        _post_and_advance(q_index, student_postings)
+        return
+
+    profiling.count("submit.wrong")
+    ss.attempts += 1
+    ss.last_correct = False
+    ss.last_message = "Not quite"
+    ss.last_feedback = feedback
+
+    hint = diagnose(student_postings, q.answer_key, q.expected)
+    if hint:
+        ss.last_feedback = ss.last_feedback + "\n\n" + hint
+
+    if ss.attempts >= 2:
+        ss.last_message = "Two attempts used. Model answer posted."
+        ss.last_journal = format_journal(q.expected)
+        ss.last_feedback = ""
+        _post_and_advance(q_index, q.expected)
+        return
+
+    _persist()
+
+
+@_action
+def _on_show_answer(round_no: int, q_index: int) -> None:
+    if not _is_current(round_no, q_index):
+        return
+    ss = st.session_state
+    q = bank.get_round(round_no).questions[q_index]
+    profiling.count("show_answer")
+    ss.last_correct = None
+    ss.last_message = "Model answer posted."
+    ss.last_feedback = ""
+    ss.last_journal = format_journal(q.expected)
+    _post_and_advance(q_index, q.expected)
+
+
+# Dropdowns rerun the editor on every pick to keep the balance live; the grid
+# is one form, so a whole question costs one rerun per submit.
+ENTRY_DROPDOWNS = "Dropdowns (live balance)"
+ENTRY_GRID = "Grid (checked on submit)"
+
 with st.sidebar:
     st.header("Round")
-    round_choice = st.selectbox("Choose round (1 to 20)", list(range(1, 21)), index=0)
+    st.selectbox("Choose round (1 to 20)", list(range(1, 21)), index=0, key="round_choice")
+    st.checkbox(
+        "Carry books into the next round",
+        key="carry_books",
+        help="Closes income, expenses and drawings into Capital and brings the other balances forward.",
+    )
+    entry_mode = st.radio("Journal entry", [ENTRY_DROPDOWNS, ENTRY_GRID], key="entry_mode")
 
     st.markdown("")
 
-    if st.button("Start new round", type="primary"):
-        st.session_state.started = True
-        st.session_state.round_no = int(round_choice)
-        st.session_state.questions = build_round(st.session_state.round_no, 10)
-        st.session_state.q_index = 0
-        st.session_state.score = 0
-        st.session_state.attempts = 0
-        st.session_state.ledger = Ledger()
+    st.button("Start new round", type="primary", on_click=_on_start)
+    st.button("Reset everything", on_click=_on_reset)
 
-        st.session_state.last_message = ""
-        st.session_state.last_feedback = ""
-        st.session_state.last_journal = ""
-        st.session_state.lines = 2
-        st.session_state.last_correct = None
-        st.session_state.current_q_index = -1
-
-        st.rerun()
-
-    if st.button("Reset everything"):
-        for k in list(st.session_state.keys()):
-            del st.session_state[k]
-        st.rerun()
+    if is_admin:
+        profiling_panel()
 
 if not st.session_state.started:
     st.info("Choose a round in the sidebar, then click Start new round.")
-    st.stop()
+    _stop()
 
 # Second guard
-if "ledger" not in st.session_state or "questions" not in st.session_state or "round_no" not in st.session_state:
+if "ledger" not in st.session_state or "round_no" not in st.session_state:
     st.session_state.started = False
     st.warning("Session reloaded. Please click Start new round.")
-    st.stop()
-
-round_no: int = st.session_state.round_no
-questions: List[Question] = st.session_state.questions
-ledger: Ledger = st.session_state.ledger
-q_index: int = st.session_state.q_index
-
-# End-of-round screen
-if q_index >= len(questions):
-    st.markdown('<div class="card">', unsafe_allow_html=True)
-    st.subheader(f"Round {round_no} complete")
-    st.write(f"Final score: **{st.session_state.score} / 10**")
-    st.markdown("</div>", unsafe_allow_html=True)
+    _stop()
 
+# ----------------------------
+# Panels (fragments)
+# ----------------------------
+# Each fragment reruns on its own when one of its widgets changes, so picking
+# a dropdown in the journal editor never re-renders the T accounts. Buttons
+# that post to the ledger sit outside the fragments so their click reruns
+# the whole app.
+
+@st.fragment
+@profiling.timed("panel.trial_balance")
+def trial_balance_panel(ledger: Ledger) -> None:
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("Trial balance")
-    tb_rows = ledger.trial_balance_rows()
+    tb = ledger.trial_balance_columns()
 
-    if len(tb_rows) == 1:
+    if len(tb["Account"]) == 1:
         st.write("No postings.")
     else:
-        st.dataframe(tb_rows, use_container_width=True, hide_index=True)
-        total_dr = int(tb_rows[-1]["Debit (£)"])
-        total_cr = int(tb_rows[-1]["Credit (£)"])
+        st.dataframe(tb, use_container_width=True, hide_index=True)
+        total_dr = int(tb["Debit (£)"][-1])
+        total_cr = int(tb["Credit (£)"][-1])
         if total_dr == total_cr:
             st.success(f"Trial balance agrees £{total_dr:,}")
         else:
@@ -602,167 +498,226 @@ if q_index >= len(questions):
 
     st.markdown("</div>", unsafe_allow_html=True)
 
+
+@st.fragment
+@profiling.timed("panel.statements")
+def financial_statements_panel(ledger: Ledger) -> None:
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.subheader("Financial statements")
+    fs = ledger.statements()
+    inc_col, bs_col = st.columns([1, 1])
+    with inc_col:
+        st.markdown("**Income statement**")
+        st.dataframe(fs.income_statement(), use_container_width=True, hide_index=True)
+    with bs_col:
+        st.markdown("**Balance sheet**")
+        st.dataframe(fs.balance_sheet(), use_container_width=True, hide_index=True)
+    if not fs.balances_agree():
+        st.warning(f"Net assets £{fs.net_assets():,} do not equal equity £{fs.equity():,}.")
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+@st.fragment
+@profiling.timed("panel.reconciliation")
+def reconciliation_panel(ledger: Ledger, round_no: int) -> None:
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.subheader("Checked against the model answers")
+    rec = reconcile(ledger, round_no)
+    if rec.agrees:
+        st.success("Every account and every question matches the model ledger.")
+    else:
+        accounts = ", ".join(d.account for d in rec.by_account)
+        if accounts:
+            st.warning(f"Balances differ from the model in: {accounts}.")
+        else:
+            st.warning("Account balances match the model, but some questions were posted differently.")
+        st.dataframe(rec.columns(), use_container_width=True, hide_index=True)
+        st.caption("Amounts are signed: debits positive, credits negative.")
+    if rec.untagged:
+        st.caption("Opening balances brought down are not compared.")
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+T_PAGE_SIZE = 50
+
+
+def _bal_text(side: str, amt: int) -> str:
+    return f"{side} £{amt:,}" if side else "£0"
+
+
+def t_account_table(ledger: Ledger, name: str, view_key: str) -> None:
+    # Long accounts are paged: only one window of lines goes to the browser,
+    # and the totals and balances come from running totals / prefix sums.
+    acc = ledger.get(name)
+    n = acc.line_count()
+    if n <= T_PAGE_SIZE:
+        st.dataframe(ledger.t_account_columns(name), use_container_width=True, hide_index=True)
+        return
+
+    dr_total, cr_total = acc.totals()
+    pages = (n + T_PAGE_SIZE - 1) // T_PAGE_SIZE
+    st.caption(f"{n:,} lines. Debits £{dr_total:,}. Credits £{cr_total:,}. Balance {_bal_text(*acc.balance())}.")
+    page = st.number_input(f"Page (1 to {pages})", min_value=1, max_value=pages, value=pages, key=f"{view_key}_page_{name}")
+    w = ledger.t_account_window(name, (int(page) - 1) * T_PAGE_SIZE, T_PAGE_SIZE)
+    st.caption(f"Lines {w.offset + 1:,} to {w.end:,}. Balance b/f {_bal_text(*w.opening)}.")
+    st.dataframe(w.columns, use_container_width=True, hide_index=True)
+    st.caption(f"Balance c/f {_bal_text(*w.closing)}.")
+
+
+@st.fragment
+@profiling.timed("panel.t_accounts")
+def t_accounts_panel(ledger: Ledger, view_key: str, empty_text: str, tip: bool = False) -> None:
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("T accounts")
+    if tip:
+        st.markdown('<div class="small-muted">Mobile tip: choose one account. PC tip: use “All accounts” and expand.</div>', unsafe_allow_html=True)
+
     names = ledger.used_account_names()
     if not names:
-        st.write("No postings.")
+        st.write(empty_text)
     else:
-        view = st.selectbox("View", ["All accounts"] + names, index=0, key="t_view_end")
+        view = st.selectbox("View", ["All accounts"] + names, index=0, key=view_key)
+
         if view == "All accounts":
             for name in names:
-                side, amt = ledger.get(name).balance()
-                bal_text = f"{side} £{amt:,}" if side else "£0"
+                bal_text = _bal_text(*ledger.get(name).balance())
                 with st.expander(f"{name}  |  Balance {bal_text}", expanded=False):
-                    st.dataframe(ledger.t_account_table_rows(name), use_container_width=True, hide_index=True)
+                    t_account_table(ledger, name, view_key)
         else:
-            side, amt = ledger.get(view).balance()
-            bal_text = f"{side} £{amt:,}" if side else "£0"
+            bal_text = _bal_text(*ledger.get(view).balance())
             st.markdown(f"**{view}**  |  Balance **{bal_text}**")
-            st.dataframe(ledger.t_account_table_rows(view), use_container_width=True, hide_index=True)
+            t_account_table(ledger, view, view_key)
+
     st.markdown("</div>", unsafe_allow_html=True)
-    st.stop()
 
-# Main layout
-left, right = st.columns([1.08, 0.92])
 
-with left:
-    st.markdown('<div class="card">', unsafe_allow_html=True)
+def live_balance_check(rows: List[Row], title: str = "Live balance check") -> Tuple[int, int]:
+    dr_total, cr_total = _totals(rows)
+    diff = dr_total - cr_total
+
+    st.markdown(f"#### {title}")
+    if diff == 0 and rows:
+        st.success(f"Balanced. Debits £{dr_total:,} equal Credits £{cr_total:,}.")
+    else:
+        direction = "Dr too high" if diff > 0 else "Cr too high" if diff < 0 else "No lines yet"
+        st.warning(f"Not balanced. Total Dr £{dr_total:,}. Total Cr £{cr_total:,}. Difference £{abs(diff):,}. {direction}.")
+    return dr_total, cr_total
+
+
+JOURNAL_WIDGET_PREFIXES = ("side_", "acct_", "amt_", "grid_")
 
+
+def _prune_journal_widgets(round_no: int, q_index: int) -> None:
+    # Dropdown state of finished questions is never read again; drop it so
+    # long sessions do not keep every answered question's widgets alive.
+    keep = tuple(f"{p}{round_no}_{q_index}_" for p in JOURNAL_WIDGET_PREFIXES)
+    for k in list(st.session_state.keys()):
+        if k.startswith(JOURNAL_WIDGET_PREFIXES) and not k.startswith(keep):
+            del st.session_state[k]
+
+
+def _change_lines(delta: int) -> None:
+    st.session_state.lines = max(2, min(8, st.session_state.lines + delta))
+
+
+@st.fragment
+@profiling.timed("panel.journal_lines")
+def dropdown_lines(round_no: int, q_index: int, accounts: List[str], amounts: List[int], ledger: Ledger) -> None:
+    with profiling.section("journal.widgets"):
+        for i in range(st.session_state.lines):
+            c1, c2, c3 = st.columns([1, 3, 2])
+            with c1:
+                st.selectbox(f"Side {i+1}", ["DR", "CR"], key=f"side_{round_no}_{q_index}_{i}")
+            with c2:
+                st.selectbox(f"Account {i+1}", [""] + accounts, key=f"acct_{round_no}_{q_index}_{i}")
+            with c3:
+                st.selectbox(
+                    f"Amount {i+1}",
+                    [0] + amounts,
+                    format_func=lambda x: "Select amount" if x == 0 else f"£{x:,}",
+                    key=f"amt_{round_no}_{q_index}_{i}",
+                )
+
+    rows = _dropdown_rows(round_no, q_index)
+    live_balance_check(rows)
+
+    add_col, remove_col = st.columns([1, 1])
+    with add_col:
+        st.button("Add a line", on_click=_change_lines, args=(1,))
+    with remove_col:
+        st.button("Remove a line", on_click=_change_lines, args=(-1,))
+
+    if st.toggle("Preview in T accounts", key="preview_draft") and rows:
+        draft_preview(ledger, rows, q_index)
+
+
+def draft_preview(ledger: Ledger, rows: List[Row], q_index: int) -> None:
+    # The draft is posted for the length of this block and taken back on
+    # exit, so only the accounts it touches are re-rendered.
+    draft = annotate_with_from_to([Posting(account=a, side=s, amount=amt) for s, a, amt in rows], q_index + 1)
+    with profiling.section("journal.preview"), ledger.preview(draft):
+        for name in dict.fromkeys(p.account for p in draft):
+            st.markdown(f"**{name}**  |  Balance after this entry **{_bal_text(*ledger.get(name).balance())}**")
+            t_account_table(ledger, name, "t_view_preview")
+
+
+def grid_form(round_no: int, q_index: int, accounts: List[str], amounts: List[int]) -> None:
+    # The grid sits in a form: picking cells and adding or deleting rows all
+    # happen in the browser, and only Submit entry reaches the server.
+    n = st.session_state.lines
+    key = f"grid_{round_no}_{q_index}_journal"
+    with st.form(f"journal_form_{round_no}_{q_index}", border=False):
+        st.data_editor(
+            {"Side": ["DR"] * n, "Account": [None] * n, "Amount (£)": [None] * n},
+            key=key,
+            num_rows="dynamic",
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "Side": st.column_config.SelectboxColumn("Side", options=["DR", "CR"], required=True, default="DR"),
+                "Account": st.column_config.SelectboxColumn("Account", options=accounts),
+                "Amount (£)": st.column_config.SelectboxColumn("Amount (£)", options=amounts),
+            },
+        )
+        st.form_submit_button("Submit entry", type="primary", on_click=_on_submit, args=(round_no, q_index, True))
+
+    if st.session_state.get(key):
+        live_balance_check(_grid_rows(round_no, q_index), "Balance check")
+
+
+@profiling.timed("panel.journal_editor")
+def journal_editor(round_no: int, q_index: int, q: Question, amounts: List[int], grid: bool = False) -> None:
     st.markdown(
         f'<span class="pill">Round {round_no}</span>'
         f'<span class="pill">Question {q_index + 1} of 10</span>',
         unsafe_allow_html=True
     )
 
-    st.markdown('<div class="metric-wrap">', unsafe_allow_html=True)
     st.markdown(f"""
+      <div class="metric-wrap">
       <div class="metric"><div class="label">Score</div><div class="value">{st.session_state.score} / {q_index}</div></div>
       <div class="metric"><div class="label">Attempts used</div><div class="value">{st.session_state.attempts} / 2</div></div>
+      </div>
     """, unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
-
-    q = questions[q_index]
-
-    expected_lines = max(2, min(6, len(q.expected)))
-    if st.session_state.get("current_q_index", -1) != q_index:
-        st.session_state.current_q_index = q_index
-        st.session_state.lines = expected_lines
-        st.session_state.last_message = ""
-        st.session_state.last_feedback = ""
-        st.session_state.last_journal = ""
-        st.session_state.last_correct = None
-        st.session_state.attempts = 0
 
     st.markdown(f"### {q.prompt}")
-    st.markdown('<div class="small-muted">Build your journal entry using dropdowns</div>', unsafe_allow_html=True)
-
     accounts = account_options_for_round(round_no)
-    rng = random.Random(5000 + round_no + q_index)
-    amounts = amount_options(q.expected, rng)
-
-    rows: List[Tuple[str, str, int]] = []
-    for i in range(st.session_state.lines):
-        c1, c2, c3 = st.columns([1, 3, 2])
-        with c1:
-            side = st.selectbox(f"Side {i+1}", ["DR", "CR"], key=f"side_{round_no}_{q_index}_{i}")
-        with c2:
-            account = st.selectbox(f"Account {i+1}", [""] + accounts, key=f"acct_{round_no}_{q_index}_{i}")
-        with c3:
-            amount = st.selectbox(
-                f"Amount {i+1}",
-                [0] + amounts,
-                format_func=lambda x: "Select amount" if x == 0 else f"£{x:,}",
-                key=f"amt_{round_no}_{q_index}_{i}",
-            )
-
-        if account and amount > 0:
-            rows.append((side, account, amount))
-
-    dr_total = sum(a for s, _, a in rows if s == "DR")
-    cr_total = sum(a for s, _, a in rows if s == "CR")
-    diff = dr_total - cr_total
 
-    st.markdown("#### Live balance check")
-    if diff == 0 and rows:
-        st.success(f"Balanced. Debits £{dr_total:,} equal Credits £{cr_total:,}.")
+    if grid:
+        st.markdown('<div class="small-muted">Fill in the grid, adding or deleting rows as needed, then submit</div>', unsafe_allow_html=True)
+        grid_form(round_no, q_index, accounts, amounts)
+        st.button("Show model answer and post it", on_click=_on_show_answer, args=(round_no, q_index))
     else:
-        direction = "Dr too high" if diff > 0 else "Cr too high" if diff < 0 else "No lines yet"
-        st.warning(f"Not balanced. Total Dr £{dr_total:,}. Total Cr £{cr_total:,}. Difference £{abs(diff):,}. {direction}.")
+        st.markdown('<div class="small-muted">Build your journal entry using dropdowns</div>', unsafe_allow_html=True)
+        dropdown_lines(round_no, q_index, accounts, amounts, st.session_state.ledger)
 
-    add_col, remove_col = st.columns([1, 1])
-    with add_col:
-        if st.button("Add a line"):
-            if st.session_state.lines < 8:
-                st.session_state.lines += 1
-                st.rerun()
-    with remove_col:
-        if st.button("Remove a line"):
-            if st.session_state.lines > 2:
-                st.session_state.lines -= 1
-                st.rerun()
-
-    st.markdown("<hr>", unsafe_allow_html=True)
-
-    col_a, col_b = st.columns([1, 1])
-    with col_a:
-        submitted = st.button("Submit entry", type="primary")
-    with col_b:
-        show_answer = st.button("Show model answer and post it")
-
-    if submitted:
-        if not rows:
-            st.session_state.last_correct = False
-            st.session_state.last_message = "Not marked. Please select at least two lines with accounts and amounts."
-            st.session_state.last_feedback = ""
-        elif dr_total != cr_total:
-            st.session_state.last_correct = False
-            st.session_state.last_message = "Not marked. Your entry must balance before you submit."
-            st.session_state.last_feedback = ""
-        else:
-            student_postings = [Posting(account=a, side=s, amount=amt, narrative="") for (s, a, amt) in rows]
-            ok, feedback = mark(student_postings, q.expected)
-
-            if ok:
-                ledger.post_many(annotate_with_from_to(student_postings, q_index + 1))
-                st.session_state.score += 1
-                st.session_state.last_correct = True
-                st.session_state.last_message = "Correct"
-                st.session_state.last_feedback = ""
-                st.session_state.last_journal = format_journal(student_postings)
-
-                st.session_state.q_index += 1
-                st.session_state.attempts = 0
-                st.rerun()
-            else:
-                st.session_state.attempts += 1
-                st.session_state.last_correct = False
-                st.session_state.last_message = "Not quite"
-                st.session_state.last_feedback = feedback
-
-                hint = generate_hint(student_postings, q.expected)
-                if hint:
-                    st.session_state.last_feedback = st.session_state.last_feedback + "\n\n" + hint
-
-                if st.session_state.attempts >= 2:
-                    ledger.post_many(annotate_with_from_to(q.expected, q_index + 1))
-                    st.session_state.last_message = "Two attempts used. Model answer posted."
-                    st.session_state.last_journal = format_journal(q.expected)
-                    st.session_state.last_feedback = ""
-                    st.session_state.q_index += 1
-                    st.session_state.attempts = 0
-                    st.rerun()
-
-    if show_answer:
-        ledger.post_many(annotate_with_from_to(q.expected, q_index + 1))
-        st.session_state.last_correct = None
-        st.session_state.last_message = "Model answer posted."
-        st.session_state.last_feedback = ""
-        st.session_state.last_journal = format_journal(q.expected)
+        st.markdown("<hr>", unsafe_allow_html=True)
 
-        st.session_state.q_index += 1
-        st.session_state.attempts = 0
-        st.rerun()
+        col_a, col_b = st.columns([1, 1])
+        with col_a:
+            st.button("Submit entry", type="primary", on_click=_on_submit, args=(round_no, q_index, False))
+        with col_b:
+            st.button("Show model answer and post it", on_click=_on_show_answer, args=(round_no, q_index))
 
     if st.session_state.get("last_message", ""):
         if st.session_state.last_correct is True:
@@ -779,29 +734,58 @@ with left:
         st.markdown("#### Double entry posted")
         st.code(st.session_state.get("last_journal", ""), language="text")
 
+
+round_no: int = st.session_state.round_no
+round_bank = bank.get_round(round_no)
+questions: Tuple[Question, ...] = round_bank.questions
+ledger: Ledger = st.session_state.ledger
+q_index: int = st.session_state.q_index
+
+# End-of-round screen
+if q_index >= len(questions):
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.subheader(f"Round {round_no} complete")
+    st.write(f"Final score: **{st.session_state.score} / 10**")
     st.markdown("</div>", unsafe_allow_html=True)
 
-with right:
+    trial_balance_panel(ledger)
+    reconciliation_panel(ledger, round_no)
+    financial_statements_panel(ledger)
+    t_accounts_panel(ledger, "t_view_end", "No postings.")
+    _stop()
+
+closing = st.session_state.get("last_close")
+if closing is not None and q_index == 0:
+    result = "Profit" if closing.profit >= 0 else "Loss"
+    st.info(
+        f"{closing.label} closed. {result} £{abs(closing.profit):,} transferred to Capital. "
+        f"{closing.postings_archived:,} postings archived, {len(closing.carried)} balances brought down."
+    )
+
+# Main layout
+left, right = st.columns([1.08, 0.92])
+
+with left:
     st.markdown('<div class="card">', unsafe_allow_html=True)
-    st.subheader("T accounts")
-    st.markdown('<div class="small-muted">Mobile tip: choose one account. PC tip: use “All accounts” and expand.</div>', unsafe_allow_html=True)
 
-    names = ledger.used_account_names()
-    if not names:
-        st.write("No postings yet.")
-    else:
-        view = st.selectbox("View", ["All accounts"] + names, index=0, key="t_view_midround")
+    q = questions[q_index]
 
-        if view == "All accounts":
-            for name in names:
-                side, amt = ledger.get(name).balance()
-                bal_text = f"{side} £{amt:,}" if side else "£0"
-                with st.expander(f"{name}  |  Balance {bal_text}", expanded=False):
-                    st.dataframe(ledger.t_account_table_rows(name), use_container_width=True, hide_index=True)
-        else:
-            side, amt = ledger.get(view).balance()
-            bal_text = f"{side} £{amt:,}" if side else "£0"
-            st.markdown(f"**{view}**  |  Balance **{bal_text}**")
-            st.dataframe(ledger.t_account_table_rows(view), use_container_width=True, hide_index=True)
+    expected_lines = max(2, min(6, len(q.expected)))
+    if st.session_state.get("current_q_index", -1) != q_index:
+        _prune_journal_widgets(round_no, q_index)
+        st.session_state.current_q_index = q_index
+        st.session_state.lines = expected_lines
+        st.session_state.last_message = ""
+        st.session_state.last_feedback = ""
+        st.session_state.last_journal = ""
+        st.session_state.last_correct = None
+        st.session_state.attempts = 0
+
+    journal_editor(round_no, q_index, q, list(round_bank.amount_options[q_index]), grid=entry_mode == ENTRY_GRID)
 
     st.markdown("</div>", unsafe_allow_html=True)
+
+with right:
+    t_accounts_panel(ledger, "t_view_midround", "No postings yet.", tip=True)
+
+_finish_rerun()
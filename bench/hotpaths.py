@@ -0,0 +1,256 @@
+import argparse
+import functools
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from engine import (  # noqa: E402
+    CompactLedger,
+    Ledger,
+    Posting,
+    amount_options,
+    annotate_with_from_to,
+    build_round,
+    diagnose,
+    generate_hint,
+    mark,
+)
+from engine import bank  # noqa: E402
+from engine.reconcile import model_ledger, reconcile, reconcile_class  # noqa: E402
+
+
+# ----------------------------
+# Engine hot-path benchmarks
+# ----------------------------
+# python bench/hotpaths.py -o bench.json
+# python bench/hotpaths.py --sizes 10,1000,100000,10000000 --accounts 24,1000
+# python bench/hotpaths.py --compare bench.json --threshold 0.25   (exit 1 on regression)
+# At 10M postings the synthetic journal alone is 10M Posting objects (about
+# 1 GB) whatever the backend; --backend compact only saves the ledger's own
+# copy, which for the list-backed Ledger is several GB more.
+#
+# Results are keyed by case name, e.g. "ledger.post_many[n=100000,accounts=24]",
+# so runs on the same machine can be diffed directly.
+
+Case = Tuple[str, Callable[[], Any], Callable[[Any], Any]]  # name, setup, fn(state)
+
+
+def per_call(setup: Callable[[], Any]) -> Callable[[], Any]:
+    # For cases whose fn changes its state (posting into a ledger): every
+    # call then gets a fresh state, built before the clock starts.
+    def make() -> Any:
+        return setup()
+
+    make.per_call = True  # type: ignore[attr-defined]
+    return make
+
+
+def _timeit(setup: Callable[[], Any], fn: Callable[[Any], Any], repeat: int, min_time: float) -> Dict[str, Any]:
+    # Calibrate how many calls fit in min_time, then take `repeat` samples.
+    fresh = getattr(setup, "per_call", False)
+
+    def run(number: int) -> float:
+        states = [setup() for _ in range(number)] if fresh else [setup()] * number
+        t0 = time.perf_counter()
+        for state in states:
+            fn(state)
+        return time.perf_counter() - t0
+
+    number = 1
+    while True:
+        elapsed = run(number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10
+    samples = [elapsed / number] + [run(number) / number for _ in range(repeat - 1)]
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def synthetic_postings(n: int, accounts: int, seed: int = 0) -> List[Posting]:
+    rng = random.Random(seed)
+    names = [f"Account {i:04d}" for i in range(accounts)]
+    narratives = [f"Q{q} from Bank" for q in range(1, 11)]  # shared, as the game's are
+    out: List[Posting] = []
+    for i in range(n):
+        out.append(Posting(
+            account=names[rng.randrange(accounts)],
+            side="DR" if i % 2 == 0 else "CR",
+            amount=rng.randrange(50, 12000, 50),
+            narrative=narratives[i % 10],
+        ))
+    return out
+
+
+def engine_cases() -> List[Case]:
+    cases: List[Case] = []
+    for r in range(1, 21):
+        cases.append((f"build_round[round={r}]", lambda: None, lambda _, r=r: build_round(r, 10)))
+
+    questions = [q for r in range(1, 21) for q in bank.get_round(r).questions]
+    cases.append((
+        "amount_options[200 questions]",
+        lambda: random.Random(5000),
+        lambda rng: [amount_options(q.expected, rng) for q in questions],
+    ))
+
+    def wrong(q):
+        return [Posting(p.account, "CR" if p.side == "DR" else "DR", p.amount) for p in q.expected]
+
+    right_answers = [(list(q.expected), q) for q in questions]
+    wrong_answers = [(wrong(q), q) for q in questions]
+    cases.append(("mark[correct,200 questions]", lambda: None,
+                  lambda _: [mark(s, q.answer_key) for s, q in right_answers]))
+    cases.append(("mark[wrong,200 questions]", lambda: None,
+                  lambda _: [mark(s, q.answer_key) for s, q in wrong_answers]))
+    cases.append(("generate_hint[wrong,200 questions]", lambda: None,
+                  lambda _: [generate_hint(s, q.expected) for s, q in wrong_answers]))
+    cases.append(("diagnose[wrong,200 questions]", lambda: None,
+                  lambda _: [diagnose(s, q.answer_key, q.expected) for s, q in wrong_answers]))
+    cases.append(("annotate_with_from_to[200 questions]", lambda: None,
+                  lambda _: [annotate_with_from_to(q.expected, i % 10 + 1) for i, q in enumerate(questions)]))
+    cases.append(("reconcile[1 ledger]", lambda: model_ledger(1), lambda led: reconcile(led, 1)))
+    cases.append(("reconcile_class[500 ledgers]", lambda: [(str(i), model_ledger(1)) for i in range(500)],
+                  lambda ledgers: reconcile_class(1, ledgers)))
+    return cases
+
+
+def _filled(cls, postings: Callable[[], List[Posting]]):
+    ledger = cls()
+    ledger.post_many(postings())
+    return ledger
+
+
+def _cold(ledger):
+    if hasattr(ledger, "clear_render_cache"):
+        ledger.clear_render_cache()
+    return ledger
+
+
+def _with_statements() -> Ledger:
+    ledger = Ledger()
+    ledger.statements()
+    return ledger
+
+
+_DRAFT = [Posting("Account 0000", "DR", 100, "draft"), Posting("Account 0001", "CR", 100, "draft")]
+
+
+def _preview(ledger: Ledger):
+    with ledger.preview(_DRAFT):
+        return ledger.t_account_window("Account 0000", 0, 50)
+
+
+def ledger_cases(sizes: List[int], account_counts: List[int], backend: str) -> List[Case]:
+    # Journals and filled ledgers are built on first use, so --filter skips
+    # the cost of sizes it does not run.
+    cls = CompactLedger if backend == "compact" else Ledger
+    busiest = "Account 0000"  # accounts are drawn uniformly, so any one is typical
+    cases: List[Case] = []
+    for accounts in account_counts:
+        for n in sizes:
+            tag = f"{backend}.%s[n={n},accounts={accounts}]"
+            postings = functools.cache(lambda n=n, a=accounts: synthetic_postings(n, a))
+            filled = functools.cache(lambda ps=postings: _filled(cls, ps))
+
+            cases.append((tag % "post_many", per_call(cls), lambda led, ps=postings: led.post_many(ps())))
+            cases.append((tag % "trial_balance_rows", filled,
+                          lambda led: led.trial_balance_rows()))
+            cases.append((tag % "trial_balance_rows/cold", filled,
+                          lambda led: _cold(led).trial_balance_rows()))
+            cases.append((tag % "t_account_table_rows/cold", filled,
+                          lambda led: _cold(led).t_account_table_rows(busiest)))
+            if backend == "ledger":
+                cases.append((tag % "t_account_window", filled,
+                              lambda led: led.t_account_window(busiest, 0, 50)))
+                cases.append((tag % "post_many+statements", per_call(_with_statements),
+                              lambda led, ps=postings: led.post_many(ps())))
+                cases.append((tag % "preview", filled, _preview))
+    return cases
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    regressions: List[str] = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = res["median_s"] / base["median_s"] if base["median_s"] else 1.0
+        res["baseline_median_s"] = base["median_s"]
+        res["ratio"] = ratio
+        if ratio > 1.0 + threshold:
+            regressions.append(f"{name}: {base['median_s'] * 1e3:.3f} ms -> {res['median_s'] * 1e3:.3f} ms ({ratio:.2f}x)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the engine hot paths.")
+    parser.add_argument("--sizes", default="10,1000,100000", help="ledger sizes in postings (comma separated)")
+    parser.add_argument("--accounts", default="24", help="account counts (comma separated)")
+    parser.add_argument("--backend", choices=["ledger", "compact", "both"], default="ledger")
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per sample before calibrating stops")
+    parser.add_argument("-o", "--output", default="", help="write results JSON here")
+    parser.add_argument("--compare", default="", help="baseline results JSON")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(x) for x in args.sizes.split(",") if x]
+    account_counts = [int(x) for x in args.accounts.split(",") if x]
+    backends = ["ledger", "compact"] if args.backend == "both" else [args.backend]
+
+    bank.prebuild()
+    cases = engine_cases()
+    for b in backends:
+        cases += ledger_cases(sizes, account_counts, b)
+
+    results: Dict[str, Dict] = {}
+    for name, setup, fn in cases:
+        if args.filter and args.filter not in name:
+            continue
+        res = _timeit(setup, fn, args.repeat, args.min_time)
+        results[name] = res
+        print(f"{name:<60} {res['median_s'] * 1e3:>12.4f} ms")
+
+    regressions: List[str] = []
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+
+    if args.output:
+        doc = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "machine": platform.machine(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "argv": sys.argv[1:] if argv is None else argv,
+            },
+            "results": results,
+        }
+        Path(args.output).write_text(json.dumps(doc, indent=2, sort_keys=True))
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
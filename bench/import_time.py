@@ -0,0 +1,66 @@
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+# ----------------------------
+# Engine cold-start budget
+# ----------------------------
+# Each sample is a fresh interpreter, so nothing is served from sys.modules.
+# Run from the repo root:  python bench/import_time.py --budget-ms 100
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import sys, time
+t0 = time.perf_counter()
+import engine
+t1 = time.perf_counter()
+heavy = [m for m in ("streamlit", "numpy", "pandas", "pyarrow") if m in sys.modules]
+print((t1 - t0) * 1000.0, ",".join(heavy))
+"""
+
+
+def sample_once() -> tuple:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    ms = float(out[0])
+    heavy = out[1].split(",") if len(out) > 1 else []
+    return ms, heavy
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the engine package.")
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    samples = []
+    heavy_seen = set()
+    for _ in range(args.runs):
+        ms, heavy = sample_once()
+        samples.append(ms)
+        heavy_seen.update(heavy)
+
+    median = statistics.median(samples)
+    print(f"import engine: median {median:.2f} ms, min {min(samples):.2f} ms, max {max(samples):.2f} ms ({args.runs} runs)")
+
+    failed = False
+    if heavy_seen:
+        print(f"FAIL: engine import pulled in {', '.join(sorted(heavy_seen))}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: median {median:.2f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
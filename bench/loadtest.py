@@ -0,0 +1,348 @@
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from engine import bank, profiling  # noqa: E402
+from engine.memory import session_footprint  # noqa: E402
+
+
+# ----------------------------
+# Headless multi-session load test
+# ----------------------------
+# python bench/loadtest.py --players 40 --procs 4 -o load.json
+#
+# Every simulated player is a Streamlit AppTest session running app.py
+# in-process, so no server, browser or network is involved. Within each
+# worker process all of its players stay alive and take turns, so memory is
+# measured with every session resident at once. Actions per question:
+# pick dropdowns, then submit a correct entry, submit wrong entries, or use
+# "Show model answer".
+#
+# AppTest always reruns the whole app, including for a dropdown pick that a
+# browser would send as a rerun of the editor fragment alone. Picks are
+# therefore reported as "select_full_rerun": an upper bound on pick latency,
+# not the fragment rerun a player sees.
+#
+# --entry grid plays the form-batched grid instead. AppTest cannot edit an
+# st.data_editor, so GridEdits stands in for the browser and sends the same
+# edit delta the grid sends when its form is submitted.
+#
+# Each sample also records how many times app.py ran top to bottom (the
+# "script.run" counter). Every action should cost at most one run: buttons
+# act in on_click callbacks instead of calling st.rerun(), and nothing may
+# chain a second run. --check-runs exits non-zero otherwise.
+
+APP = str(ROOT / "app.py")
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is KiB on Linux, bytes on macOS; peak rather than current
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _grid_edits_widget():
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+    from streamlit.testing.v1.element_tree import Widget
+
+    class GridEdits(Widget):
+        def __init__(self, node, rows: List[Tuple[str, str, int]]) -> None:
+            self.proto = node.proto
+            self.root = node.root
+            self.type = "data_editor"
+            self.id = node.proto.id
+            self.key = node.key
+            self.disabled = False
+            self._value = None
+            self.edits = {
+                "edited_rows": {str(i): {"Side": s, "Account": a, "Amount (£)": v} for i, (s, a, v) in enumerate(rows)},
+                "added_rows": [],
+                "deleted_rows": [],
+            }
+
+        @property
+        def value(self) -> Dict:
+            return self.edits
+
+        @property
+        def _widget_state(self) -> WidgetState:
+            ws = WidgetState()
+            ws.id = self.id
+            ws.string_value = json.dumps(self.edits)
+            return ws
+
+    return GridEdits
+
+
+def _fill_grid(at, key: str, rows: List[Tuple[str, str, int]]) -> None:
+    grid_cls = _grid_edits_widget()
+
+    def walk(block) -> bool:
+        for i, child in list(block.children.items()):
+            if getattr(child, "key", None) == key:
+                block.children[i] = grid_cls(child, rows)
+                return True
+            if hasattr(child, "children") and walk(child):
+                return True
+        return False
+
+    if not walk(at._tree):
+        raise LookupError(f"no grid {key!r}")
+
+
+def _script_runs() -> int:
+    return profiling.snapshot()["counters"].get("script.run", 0)
+
+
+def _button(at, label: str):
+    for b in at.button:
+        if b.label == label:
+            return b
+    raise LookupError(f"no button {label!r}")
+
+
+Sample = Tuple[str, float, int]  # action, latency, full script runs
+
+
+class Player:
+    def __init__(self, player_id: int, round_no: int, rng: random.Random, wrong_rate: float, answer_rate: float,
+                 grid: bool = False) -> None:
+        from streamlit.testing.v1 import AppTest
+
+        self.id = player_id
+        self.round_no = round_no
+        self.rng = rng
+        self.wrong_rate = wrong_rate
+        self.answer_rate = answer_rate
+        self.grid = grid
+        self.grid_rows: List[Tuple[str, str, int]] = []
+        self.at = AppTest.from_file(APP, default_timeout=60)
+        self.q_index = 0
+        self.plan: List[Tuple[str, object]] = [("open", None), ("start", None)]
+        self.done = False
+
+    def _timed(self, action: str, fn) -> Sample:
+        runs0 = _script_runs()
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        if self.at.exception:
+            raise RuntimeError(f"player {self.id} {action}: {self.at.exception[0].message}")
+        return action, elapsed, _script_runs() - runs0
+
+    def _plan_question(self) -> None:
+        q = bank.get_round(self.round_no).questions[self.q_index]
+        flipped = [(("CR" if p.side == "DR" else "DR"), p.account, p.amount) for p in q.expected]
+        right = [(p.side, p.account, p.amount) for p in q.expected]
+        roll = self.rng.random()
+        if roll < self.answer_rate:
+            self.plan += [("show_answer", None)]
+        elif roll < self.answer_rate + self.wrong_rate:
+            self.plan += [("select", flipped), ("submit", None)]
+            if self.rng.random() < 0.5:
+                self.plan += [("select", right), ("submit", None)]
+            else:
+                self.plan += [("submit", None)]  # second wrong attempt posts the model answer
+        else:
+            self.plan += [("select", right), ("submit", None)]
+        self.plan.append(("next", None))
+
+    def step(self) -> List[Sample]:
+        # One user action; returns the reruns it caused with their latency.
+        at = self.at
+        action, arg = self.plan.pop(0)
+        if action == "open":
+            return [self._timed("open", at.run)]
+        if action == "start":
+            out = []
+            if self.grid:
+                out.append(self._timed("entry_mode", lambda: at.radio(key="entry_mode").set_value("Grid (checked on submit)").run()))
+            out.append(self._timed("select_round", lambda: at.sidebar.selectbox[0].select(self.round_no).run()))
+            out.append(self._timed("start_round", lambda: _button(at, "Start new round").click().run()))
+            self._plan_question()
+            return out
+        if action == "select" and self.grid:
+            # Edits stay in the browser until the next submit; no rerun.
+            self.grid_rows = arg
+            return []
+        if action == "select":
+            out = []
+            r, q = self.round_no, self.q_index
+            for i, (side, account, amount) in enumerate(arg):
+                out.append(self._timed("select_full_rerun", lambda: at.selectbox(key=f"side_{r}_{q}_{i}").set_value(side).run()))
+                out.append(self._timed("select_full_rerun", lambda: at.selectbox(key=f"acct_{r}_{q}_{i}").set_value(account).run()))
+                out.append(self._timed("select_full_rerun", lambda: at.selectbox(key=f"amt_{r}_{q}_{i}").set_value(amount).run()))
+            return out
+        if action == "submit":
+            if self.grid:
+                # The browser resends the grid's edits with every submit.
+                _fill_grid(at, f"grid_{self.round_no}_{self.q_index}_journal", self.grid_rows)
+            return [self._timed("submit", lambda: _button(at, "Submit entry").click().run())]
+        if action == "show_answer":
+            return [self._timed("show_answer", lambda: _button(at, "Show model answer and post it").click().run())]
+        # "next": move on once the app has advanced
+        self.q_index = int(at.session_state["q_index"])
+        if self.q_index >= len(bank.get_round(self.round_no).questions):
+            self.done = True
+        else:
+            self._plan_question()
+        return []
+
+
+def run_worker(args: Tuple[int, int, int, float, float, int, str, bool]) -> Dict:
+    first_id, count, questions, wrong_rate, answer_rate, seed, db_path, grid = args
+    os.environ["GAME_DB"] = db_path
+    profiling.enable()
+    bank.prebuild()
+    rss0 = _rss_bytes()
+    cpu0 = time.process_time()
+
+    rng = random.Random(seed)
+    players = [
+        Player(first_id + i, rng.randint(1, 20), random.Random(seed * 1000 + i), wrong_rate, answer_rate, grid)
+        for i in range(count)
+    ]
+    asked = {p.id: 0 for p in players}
+    samples: List[Sample] = []
+    active = list(players)
+    while active:
+        for p in list(active):
+            samples.extend(p.step())
+            if p.plan and p.plan[0][0] == "next":
+                samples.extend(p.step())
+                asked[p.id] += 1
+            if p.done or asked[p.id] >= questions:
+                active.remove(p)
+
+    state_bytes = [session_footprint(p.at.session_state.to_dict())["total"] for p in players]
+    state_keys = [len(p.at.session_state.to_dict()) for p in players]
+
+    return {
+        "players": count,
+        "samples": samples,
+        "state_bytes": state_bytes,
+        "state_keys": state_keys,
+        "cpu_s": time.process_time() - cpu0,
+        "rss_delta": _rss_bytes() - rss0,
+        "rss": _rss_bytes(),
+    }
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    v = sorted(values)
+
+    def pct(p: float) -> float:
+        return v[min(len(v) - 1, max(0, int(round(p / 100.0 * len(v) + 0.5)) - 1))]
+
+    return {
+        "count": len(v),
+        "mean_ms": statistics.fmean(v) * 1e3,
+        "p50_ms": pct(50) * 1e3,
+        "p95_ms": pct(95) * 1e3,
+        "p99_ms": pct(99) * 1e3,
+        "max_ms": v[-1] * 1e3,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Drive app.py headlessly with N simulated players.")
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--procs", type=int, default=1, help="worker processes (players are split between them)")
+    parser.add_argument("--questions", type=int, default=10, help="questions each player answers")
+    parser.add_argument("--wrong-rate", type=float, default=0.3)
+    parser.add_argument("--answer-rate", type=float, default=0.1, help='share of questions using "Show model answer"')
+    parser.add_argument("--entry", choices=["dropdowns", "grid"], default="dropdowns", help="journal entry mode to play")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--check-runs", action="store_true", help="fail if any action runs app.py more than once")
+    parser.add_argument("-o", "--output", default="")
+    args = parser.parse_args(argv)
+
+    procs = max(1, min(args.procs, args.players))
+    split = [args.players // procs + (1 if i < args.players % procs else 0) for i in range(procs)]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "load.sqlite3")
+        jobs = []
+        first = 0
+        for i, count in enumerate(split):
+            jobs.append((first, count, args.questions, args.wrong_rate, args.answer_rate, args.seed + i, db, args.entry == "grid"))
+            first += count
+        t0 = time.perf_counter()
+        if procs == 1:
+            results = [run_worker(jobs[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=procs) as pool:
+                results = list(pool.map(run_worker, jobs))
+        wall = time.perf_counter() - t0
+
+    by_action: Dict[str, List[float]] = {}
+    runs_by_action: Dict[str, List[int]] = {}
+    for r in results:
+        for action, elapsed, runs in r["samples"]:
+            by_action.setdefault(action, []).append(elapsed)
+            runs_by_action.setdefault(action, []).append(runs)
+    all_samples = [e for vals in by_action.values() for e in vals]
+
+    report = {
+        "entry": args.entry,
+        "players": args.players,
+        "procs": procs,
+        "wall_s": wall,
+        "reruns": len(all_samples),
+        "reruns_per_s": len(all_samples) / wall if wall else 0.0,
+        "latency": percentiles(all_samples),
+        "latency_by_action": {a: percentiles(v) for a, v in sorted(by_action.items())},
+        "script_runs_by_action": {
+            a: {"mean": statistics.fmean(v), "max": max(v)} for a, v in sorted(runs_by_action.items())
+        },
+        "cpu_s_per_session": sum(r["cpu_s"] for r in results) / args.players,
+        "rss_bytes_per_session": sum(r["rss_delta"] for r in results) / args.players,
+        "rss_bytes_per_process": [r["rss"] for r in results],
+        "session_state_bytes_mean": statistics.fmean(b for r in results for b in r["state_bytes"]),
+        "session_state_bytes_max": max(b for r in results for b in r["state_bytes"]),
+        "session_state_keys_max": max(k for r in results for k in r["state_keys"]),
+    }
+
+    lat = report["latency"]
+    print(f"{args.players} players ({args.entry}), {procs} procs, {report['reruns']} reruns in {wall:.1f}s ({report['reruns_per_s']:.1f}/s)")
+    print(f"rerun latency p50 {lat['p50_ms']:.1f} ms  p95 {lat['p95_ms']:.1f} ms  p99 {lat['p99_ms']:.1f} ms")
+    for action, p in report["latency_by_action"].items():
+        runs = report["script_runs_by_action"][action]
+        print(f"  {action:<17} n={p['count']:<6} p50 {p['p50_ms']:8.1f}  p95 {p['p95_ms']:8.1f}  p99 {p['p99_ms']:8.1f} ms"
+              f"  script runs {runs['mean']:.2f} (max {runs['max']})")
+    print(f"cpu per session {report['cpu_s_per_session']:.2f}s, "
+          f"rss per session {report['rss_bytes_per_session'] / 1024 / 1024:.2f} MiB")
+    print(f"session_state deep size mean {report['session_state_bytes_mean'] / 1024:.1f} KiB, "
+          f"max {report['session_state_bytes_max'] / 1024:.1f} KiB, max keys {report['session_state_keys_max']}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    if args.check_runs:
+        extra = {a: r["max"] for a, r in report["script_runs_by_action"].items() if r["max"] > 1}
+        if extra:
+            print(f"FAIL: actions costing more than one script run: {extra}")
+            return 1
+        print("OK: every action cost at most one script run")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+# Headless game engine: ledger, question generation, marking and hints.
+# Must stay importable without Streamlit (see bench/import_time.py).
+
+from .ledger import Posting, LedgerAccount, Ledger, LedgerSnapshot, PeriodClose
+from .accounts import AccountClass, classify
+from .compact import CompactAccount, CompactLedger
+from .questions import Question, build_round, account_options_for_round, amount_options
+from .marking import AnswerKey, canonical, mark, generate_hint
+from .diagnostics import diagnose
+from .narratives import annotate_with_from_to, format_journal
+
+__all__ = [
+    "Posting",
+    "LedgerAccount",
+    "Ledger",
+    "LedgerSnapshot",
+    "PeriodClose",
+    "AccountClass",
+    "classify",
+    "CompactAccount",
+    "CompactLedger",
+    "Question",
+    "build_round",
+    "account_options_for_round",
+    "amount_options",
+    "AnswerKey",
+    "canonical",
+    "mark",
+    "generate_hint",
+    "diagnose",
+    "annotate_with_from_to",
+    "format_journal",
+]
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from .templates import A
+
+
+# ----------------------------
+# Account classification
+# ----------------------------
+# kind is where the account sits: asset, liability, equity (balance sheet) or
+# income, expense (income statement). A contra account reduces its kind, so
+# its normal balance is the opposite side (accumulated depreciation, drawings,
+# returns). Accounts not listed here (e.g. synthetic benchmark accounts) are
+# unclassified and treated as balance-sheet items that carry forward.
+
+KINDS = ("asset", "liability", "equity", "income", "expense")
+
+
+@dataclass(frozen=True, slots=True)
+class AccountClass:
+    kind: str
+    contra: bool = False
+
+    @property
+    def statement(self) -> str:
+        return "income" if self.kind in ("income", "expense") else "balance"
+
+    @property
+    def normal_side(self) -> str:
+        debit = self.kind in ("asset", "expense")
+        return "DR" if debit != self.contra else "CR"
+
+
+CLASSIFICATION: Dict[str, AccountClass] = {
+    A["BANK"]: AccountClass("asset"),
+    A["AR"]: AccountClass("asset"),
+    A["EQUIP"]: AccountClass("asset"),
+    A["PREP"]: AccountClass("asset"),
+    A["VAT_IN"]: AccountClass("asset"),
+    A["SUSP"]: AccountClass("asset"),
+    A["ACCDEP"]: AccountClass("asset", contra=True),
+    A["ALLOW"]: AccountClass("asset", contra=True),
+    A["AP"]: AccountClass("liability"),
+    A["ACCR"]: AccountClass("liability"),
+    A["VAT_OUT"]: AccountClass("liability"),
+    A["CAP"]: AccountClass("equity"),
+    A["DRAW"]: AccountClass("equity", contra=True),
+    A["SALES"]: AccountClass("income"),
+    A["DISC_REC"]: AccountClass("income"),
+    A["RET_IN"]: AccountClass("income", contra=True),
+    A["PUR"]: AccountClass("expense"),
+    A["RET_OUT"]: AccountClass("expense", contra=True),
+    A["RENT"]: AccountClass("expense"),
+    A["WAGES"]: AccountClass("expense"),
+    A["UTIL"]: AccountClass("expense"),
+    A["DEP"]: AccountClass("expense"),
+    A["BAD"]: AccountClass("expense"),
+    A["DISC_ALL"]: AccountClass("expense"),
+}
+
+CAPITAL = A["CAP"]
+
+
+def classify(name: str) -> Optional[AccountClass]:
+    return CLASSIFICATION.get(name.strip())
+
+
+def closes_to_capital(name: str) -> bool:
+    # Income statement accounts and drawings are emptied into capital at period end.
+    c = classify(name)
+    return c is not None and (c.statement == "income" or (c.kind == "equity" and c.contra))
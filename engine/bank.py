@@ -0,0 +1,61 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Tuple
+
+from .diagnostics import precompute
+from .questions import Question, build_round, round_amount_options
+
+
+# ----------------------------
+# Shared question bank
+# ----------------------------
+# build_round() is deterministic, so every session playing round N sees the
+# same questions. Rounds are built once per process and shared read-only;
+# sessions keep only the round number. Each question's hint index is built
+# alongside it, so the first wrong answer does not pay for it.
+
+ROUNDS = range(1, 21)
+QUESTIONS_PER_ROUND = 10
+
+
+@dataclass(frozen=True)
+class RoundBank:
+    round_no: int
+    questions: Tuple[Question, ...]
+    amount_options: Tuple[Tuple[int, ...], ...]  # dropdown amounts, one tuple per question
+
+
+_bank: Dict[Tuple[int, int], RoundBank] = {}
+_lock = threading.Lock()
+
+
+def _build(round_no: int, n: int) -> RoundBank:
+    questions = tuple(build_round(round_no, n))
+    options = tuple(tuple(o) for o in round_amount_options(round_no, questions))
+    precompute(q.answer_key for q in questions)
+    return RoundBank(round_no=round_no, questions=questions, amount_options=options)
+
+
+def get_round(round_no: int, n: int = QUESTIONS_PER_ROUND) -> RoundBank:
+    key = (round_no, n)
+    bank = _bank.get(key)
+    if bank is None:
+        with _lock:
+            bank = _bank.get(key)
+            if bank is None:
+                bank = _build(round_no, n)
+                _bank[key] = bank
+    return bank
+
+
+def prebuild(rounds: Iterable[int] = ROUNDS, n: int = QUESTIONS_PER_ROUND) -> int:
+    count = 0
+    for r in rounds:
+        get_round(r, n)
+        count += 1
+    return count
+
+
+def clear() -> None:
+    with _lock:
+        _bank.clear()
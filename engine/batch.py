@@ -0,0 +1,129 @@
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from .compact import SIDE_CR, SIDE_DR, CompactLedger
+
+
+# ----------------------------
+# Vectorised journals
+# ----------------------------
+# A journal is three parallel arrays: account ids (indexes into a names
+# table), sides (SIDE_DR / SIDE_CR, or "DR"/"CR" strings) and int amounts.
+# NumPy is only needed here; `import engine` does not load this module.
+
+# float64 bincount weights are exact below 2**53
+_EXACT_FLOAT_LIMIT = 2 ** 53
+
+
+def as_journal_arrays(account_ids, sides, amounts) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ids = np.asarray(account_ids, dtype=np.int64)
+    amts = np.asarray(amounts, dtype=np.int64)
+    raw_sides = np.asarray(sides)
+    if raw_sides.dtype.kind in "US":
+        s = np.char.upper(np.char.strip(raw_sides.astype(str)))
+        is_dr = s == "DR"
+        if not np.all(is_dr | (s == "CR")):
+            raise ValueError("Side must be DR or CR")
+    else:
+        codes = raw_sides.astype(np.int64)
+        is_dr = codes == SIDE_DR
+        if not np.all(is_dr | (codes == SIDE_CR)) or not np.array_equal(codes, raw_sides):
+            raise ValueError("Side must be DR or CR")
+    if not (ids.shape == amts.shape == is_dr.shape) or ids.ndim != 1:
+        raise ValueError("account_ids, sides and amounts must be 1-D arrays of the same length")
+    if ids.size and ids.min() < 0:
+        raise ValueError("account ids must be non-negative")
+    return ids, is_dr, amts
+
+
+def _grouped_sum(ids: np.ndarray, weights: np.ndarray, n: int) -> np.ndarray:
+    if weights.size == 0:
+        return np.zeros(n, dtype=np.int64)
+    if int(np.abs(weights).max()) * weights.size < _EXACT_FLOAT_LIMIT:
+        return np.bincount(ids, weights=weights, minlength=n).astype(np.int64)
+    out = np.zeros(n, dtype=np.int64)
+    np.add.at(out, ids, weights)
+    return out
+
+
+def canonical_names(names: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    # Names that strip to the same account share one id, as they do in
+    # Ledger.get: returns the unique stripped names and old id -> new id.
+    index: Dict[str, int] = {}
+    remap = [index.setdefault(n.strip(), len(index)) for n in names]
+    return list(index), np.asarray(remap, dtype=np.int64)
+
+
+def _fold(remap: np.ndarray, values: np.ndarray, n: int) -> np.ndarray:
+    out = np.zeros(n, dtype=np.int64)
+    np.add.at(out, remap, values[: len(remap)])
+    return out
+
+
+def journal_totals(account_ids, sides, amounts, n_accounts: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Per-account (debit total, credit total, posting count). n_accounts is
+    # the size of the names table; when given, every id must be below it.
+    ids, is_dr, amts = as_journal_arrays(account_ids, sides, amounts)
+    if n_accounts and ids.size and int(ids.max()) >= n_accounts:
+        raise ValueError("account id out of range for names table")
+    n = max(n_accounts, int(ids.max()) + 1 if ids.size else 0)
+    dr = _grouped_sum(ids, np.where(is_dr, amts, 0), n)
+    cr = _grouped_sum(ids, np.where(is_dr, 0, amts), n)
+    counts = np.bincount(ids, minlength=n)
+    return dr, cr, counts
+
+
+def trial_balance_rows_from_totals(
+    names: Sequence[str], dr: np.ndarray, cr: np.ndarray, counts: np.ndarray
+) -> List[Dict[str, Union[str, int]]]:
+    if len(counts) > len(names) and counts[len(names):].any():
+        raise ValueError("account id out of range for names table")
+    unique, remap = canonical_names(names)
+    dr = _fold(remap, dr, len(unique))
+    cr = _fold(remap, cr, len(unique))
+    counts = _fold(remap, counts, len(unique))
+    used = sorted((unique[i], i) for i in np.flatnonzero(counts))
+    net = dr - cr
+    rows: List[Dict[str, Union[str, int]]] = []
+    total_dr = 0
+    total_cr = 0
+    for name, i in used:
+        b = int(net[i])
+        d = b if b > 0 else 0
+        c = -b if b < 0 else 0
+        total_dr += d
+        total_cr += c
+        rows.append({"Account": name, "Debit (£)": d, "Credit (£)": c})
+    rows.append({"Account": "TOTAL", "Debit (£)": total_dr, "Credit (£)": total_cr})
+    return rows
+
+
+def trial_balance_rows_from_arrays(names: Sequence[str], account_ids, sides, amounts) -> List[Dict[str, Union[str, int]]]:
+    dr, cr, counts = journal_totals(account_ids, sides, amounts, len(names))
+    return trial_balance_rows_from_totals(names, dr, cr, counts)
+
+
+def post_arrays(ledger: CompactLedger, names: Sequence[str], account_ids, sides, amounts, narrative: str = "") -> None:
+    ids, is_dr, amts = as_journal_arrays(account_ids, sides, amounts)
+    if ids.size == 0:
+        return
+    if int(ids.max()) >= len(names):
+        raise ValueError("account id out of range for names table")
+    names, remap = canonical_names(names)
+    ids = remap[ids]
+
+    dr, cr, counts = journal_totals(ids, is_dr.astype(np.int8), amts, len(names))
+    order = np.argsort(ids, kind="stable")
+    sorted_amts = amts[order]
+    sorted_dr = is_dr[order]
+    nid = ledger.narrative_id(narrative)
+
+    start = 0
+    for i, k in enumerate(counts.tolist()):
+        if not k:
+            continue
+        end = start + k
+        acc = ledger.get(names[i])
+        acc.extend_columns(sorted_amts[start:end], sorted_dr[start:end], nid, int(dr[i]), int(cr[i]))
+        start = end
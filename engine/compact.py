@@ -0,0 +1,165 @@
+from array import array
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+from .ledger import Cell, Columns, Posting, _balance_of, t_account_rows, trial_balance_columns_for, trial_balance_rows_for
+
+
+# ----------------------------
+# Compact (columnar) ledger backend
+# ----------------------------
+# Same surface as Ledger (get / post_many / used_account_names /
+# trial_balance_columns / trial_balance_rows / t_account_table_rows) but each posting costs roughly
+# 12 bytes: an int64 amount, a uint32 narrative id and one bit of side.
+# Account names and narratives are interned once per ledger.
+
+SIDE_CR = 0
+SIDE_DR = 1
+
+
+def _side_code(side: str) -> int:
+    s = side.upper().strip()
+    if s == "DR":
+        return SIDE_DR
+    if s == "CR":
+        return SIDE_CR
+    raise ValueError("Side must be DR or CR")
+
+
+class CompactAccount:
+    __slots__ = ("name", "account_id", "amounts", "narrative_ids", "sides", "n",
+                 "_dr_total", "_cr_total", "_narratives")
+
+    def __init__(self, name: str, account_id: int, narratives: List[str]) -> None:
+        self.name = name
+        self.account_id = account_id
+        self.amounts = array("q")          # int64, in posting order
+        self.narrative_ids = array("I")    # uint32 index into the ledger's narrative table
+        self.sides = bytearray()           # bitmap, bit i set when posting i is a debit
+        self.n = 0
+        self._dr_total = 0
+        self._cr_total = 0
+        self._narratives = narratives
+
+    def _append(self, side_code: int, amount: int, narrative_id: int) -> None:
+        i = self.n
+        if i & 7 == 0:
+            self.sides.append(0)
+        if side_code == SIDE_DR:
+            self.sides[i >> 3] |= 1 << (i & 7)
+            self._dr_total += amount
+        else:
+            self._cr_total += amount
+        self.amounts.append(amount)
+        self.narrative_ids.append(narrative_id)
+        self.n = i + 1
+
+    def extend_columns(self, amounts, is_debit, narrative_id: int, dr_total: int, cr_total: int) -> None:
+        # Bulk append from NumPy arrays (see engine.batch.post_arrays).
+        import numpy as np
+
+        k = len(amounts)
+        head = (-self.n) & 7  # bits still free in the last bitmap byte
+        for j in range(min(head, k)):
+            i = self.n + j
+            if is_debit[j]:
+                self.sides[i >> 3] |= 1 << (i & 7)
+        if k > head:
+            self.sides.extend(np.packbits(is_debit[head:], bitorder="little").tobytes())
+        self.amounts.frombytes(np.ascontiguousarray(amounts, dtype=np.int64).tobytes())
+        self.narrative_ids.frombytes(np.full(k, narrative_id, dtype=np.uint32).tobytes())
+        self.n += k
+        self._dr_total += dr_total
+        self._cr_total += cr_total
+
+    def is_debit(self, i: int) -> bool:
+        return bool(self.sides[i >> 3] & (1 << (i & 7)))
+
+    def iter_lines(self, want_debit: bool) -> Iterator[Tuple[str, int]]:
+        # One side's (narrative, amount) lines read straight off the columns.
+        nar, ids, amounts, sides = self._narratives, self.narrative_ids, self.amounts, self.sides
+        for i in range(self.n):
+            if bool(sides[i >> 3] & (1 << (i & 7))) == want_debit:
+                yield nar[ids[i]], amounts[i]
+
+    def _lines(self, want_debit: bool) -> List[Tuple[str, int]]:
+        return list(self.iter_lines(want_debit))
+
+    # Materialised on demand so the shared table builders can read them.
+    @property
+    def debits(self) -> List[Tuple[str, int]]:
+        return self._lines(True)
+
+    @property
+    def credits(self) -> List[Tuple[str, int]]:
+        return self._lines(False)
+
+    def totals(self) -> Tuple[int, int]:
+        return self._dr_total, self._cr_total
+
+    def balance(self) -> Tuple[str, int]:
+        return _balance_of(self._dr_total, self._cr_total)
+
+
+class CompactLedger:
+    def __init__(self) -> None:
+        self.accounts: Dict[str, CompactAccount] = {}
+        self.account_names: List[str] = []
+        self.narratives: List[str] = [""]
+        self._narrative_ids: Dict[str, int] = {"": 0}
+
+    def account_id(self, name: str) -> int:
+        return self.get(name).account_id
+
+    def narrative_id(self, narrative: str) -> int:
+        nid = self._narrative_ids.get(narrative)
+        if nid is None:
+            nid = len(self.narratives)
+            self.narratives.append(narrative)
+            self._narrative_ids[narrative] = nid
+        return nid
+
+    def get(self, name: str) -> CompactAccount:
+        key = name.strip()
+        acc = self.accounts.get(key)
+        if acc is None:
+            acc = CompactAccount(key, len(self.account_names), self.narratives)
+            self.accounts[key] = acc
+            self.account_names.append(key)
+        return acc
+
+    def post(self, account: str, side: str, amount: int, narrative: str = "") -> None:
+        self.get(account)._append(_side_code(side), amount, self.narrative_id(narrative))
+
+    def post_many(self, postings: Iterable[Posting]) -> None:
+        for p in postings:
+            self.post(p.account, p.side, p.amount, p.narrative)
+
+    def post_arrays(self, names: List[str], account_ids, sides, amounts, narrative: str = "") -> None:
+        # Vectorised batch posting; needs NumPy.
+        from .batch import post_arrays
+
+        post_arrays(self, names, account_ids, sides, amounts, narrative)
+
+    def used_account_names(self) -> List[str]:
+        return sorted(n for n, a in self.accounts.items() if a.n)
+
+    def trial_balance_columns(self) -> Columns:
+        return trial_balance_columns_for((name, self.accounts[name]) for name in self.used_account_names())
+
+    def trial_balance_rows(self) -> List[Dict[str, Union[str, int]]]:
+        return trial_balance_rows_for((name, self.accounts[name]) for name in self.used_account_names())
+
+    def t_account_table_rows(self, name: str, include_balance_lines: bool = True) -> List[Dict[str, Cell]]:
+        return t_account_rows(self.get(name), include_balance_lines)
+
+    def posting_count(self) -> int:
+        return sum(a.n for a in self.accounts.values())
+
+    def nbytes(self) -> int:
+        # Bytes held by the posting columns (excludes the interned string tables).
+        return sum(
+            a.amounts.itemsize * len(a.amounts)
+            + a.narrative_ids.itemsize * len(a.narrative_ids)
+            + len(a.sides)
+            for a in self.accounts.values()
+        )
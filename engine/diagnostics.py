@@ -0,0 +1,163 @@
+import functools
+from collections import Counter
+from itertools import combinations
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .ledger import Posting
+from .marking import AnswerKey, Line, canonical_line, generate_hint
+from .profiling import timed
+from .templates import A
+
+
+# ----------------------------
+# Diagnostic hint index
+# ----------------------------
+# For each answer key, the likely wrong answers are generated up front:
+# swapped sides, a missing VAT line, gross and net amounts mixed up, a
+# discount on the wrong side or in the wrong discount account, and a
+# commonly confused account. Each is stored under its multiset signature
+# (the same form as AnswerKey.signature), so classifying a submission is
+# one hash lookup. Anything not in the index falls back to generate_hint.
+#
+# Indexes are cached per signature, so every question that shares an
+# answer (and every grading worker) builds each one once.
+
+Signature = FrozenSet[Tuple[Line, int]]
+
+VAT_ACCOUNTS = (A["VAT_IN"], A["VAT_OUT"])
+DISCOUNT_ACCOUNTS = (A["DISC_ALL"], A["DISC_REC"])
+
+DISCOUNT_HINT = (
+    "Hint: Check the discount. Discount allowed (given to customers) is a debit expense; "
+    "discount received (from suppliers) is a credit income."
+)
+
+# Pairs students mix up, both ways round, with the hint for that mix-up.
+CONFUSED: Dict[Tuple[str, str], str] = {}
+
+
+def _confused(a: str, b: str, hint: str) -> None:
+    CONFUSED[(a, b)] = hint
+    CONFUSED[(b, a)] = hint
+
+
+_confused(A["BANK"], A["AR"], "Hint: Was this a cash or a credit transaction? Check whether the money is in the bank yet or still owed by a customer.")
+_confused(A["BANK"], A["AP"], "Hint: Was this a cash or a credit transaction? Check whether the supplier has been paid or is still owed.")
+_confused(A["AR"], A["AP"], "Hint: Customers who owe the business are trade receivables; suppliers the business owes are trade payables.")
+_confused(A["VAT_IN"], A["VAT_OUT"], "Hint: VAT paid on purchases and expenses is VAT input; VAT charged on sales is VAT output.")
+_confused(A["RET_IN"], A["RET_OUT"], "Hint: Goods returned by customers are sales returns; goods sent back to suppliers are purchase returns.")
+_confused(A["DISC_ALL"], A["DISC_REC"], DISCOUNT_HINT)
+_confused(A["ACCR"], A["PREP"], "Hint: An expense still owing at the period end is an accrual; one paid in advance is a prepayment.")
+_confused(A["DEP"], A["ACCDEP"], "Hint: The charge for the period is depreciation expense; the running total held against the asset is accumulated depreciation.")
+_confused(A["BAD"], A["ALLOW"], "Hint: The cost of bad or doubtful debts is bad debt expense; the provision held against receivables is the allowance for doubtful debts.")
+_confused(A["CAP"], A["DRAW"], "Hint: Money the owner puts in is capital; money or goods the owner takes out are drawings.")
+_confused(A["PUR"], A["EQUIP"], "Hint: Goods bought for resale are purchases; items kept for use in the business are equipment.")
+_confused(A["SALES"], A["RET_IN"], "Hint: Sales returns are recorded in their own account, not by reducing sales.")
+_confused(A["PUR"], A["RET_OUT"], "Hint: Purchase returns are recorded in their own account, not by reducing purchases.")
+
+
+def signature_of(lines: Iterable[Line]) -> Signature:
+    return frozenset(Counter(lines).items())
+
+
+def _flip(side: str) -> str:
+    return "CR" if side == "DR" else "DR"
+
+
+def _balanced(lines: Sequence[Line]) -> bool:
+    return sum(a if s == "DR" else -a for _, s, a in lines) == 0 and all(a > 0 for _, _, a in lines)
+
+
+def _swapped(lines: List[Line]) -> Iterator[Tuple[List[Line], str]]:
+    n = len(lines)
+    for k in range(1, n + 1):
+        for idx in combinations(range(n), k):
+            variant = [(a, _flip(s), amt) if i in idx else (a, s, amt) for i, (a, s, amt) in enumerate(lines)]
+            if k == n:
+                yield variant, "Hint: Right accounts and amounts, but every line is on the wrong side. Which account receives the value (Dr) and which gives it (Cr)?"
+            else:
+                names = " and ".join(lines[i][0] for i in idx)
+                yield variant, f"Hint: Right accounts and amounts, but {names} {'is' if k == 1 else 'are'} on the wrong side (Dr or Cr)."
+
+
+def _missing_vat(lines: List[Line]) -> Iterator[Tuple[List[Line], str]]:
+    for v_i, (v_acc, v_side, vat) in enumerate(lines):
+        if v_acc not in VAT_ACCOUNTS:
+            continue
+        rest = lines[:v_i] + lines[v_i + 1:]
+        hint = f"Hint: This transaction includes VAT. Record {v_acc} as its own line, separate from the net amount."
+        for i, (a, s, amt) in enumerate(rest):
+            if s == v_side:
+                # VAT folded into the net line
+                yield rest[:i] + [(a, s, amt + vat)] + rest[i + 1:], hint
+            elif amt > vat:
+                # VAT dropped and the gross line cut down to net
+                yield rest[:i] + [(a, s, amt - vat)] + rest[i + 1:], hint
+
+
+def _gross_net(lines: List[Line]) -> Iterator[Tuple[List[Line], str]]:
+    for v_acc, v_side, vat in lines:
+        if v_acc not in VAT_ACCOUNTS:
+            continue
+        for i, (a, s, amt) in enumerate(lines):
+            if a in VAT_ACCOUNTS or s != v_side:
+                continue
+            for j, (b, t, bmt) in enumerate(lines):
+                if t == v_side or b in VAT_ACCOUNTS:
+                    continue
+                hint = f"Hint: Check which amounts include VAT. {a} takes the net amount; {b} takes the VAT-inclusive total."
+                for delta in (vat, -vat):
+                    variant = list(lines)
+                    variant[i] = (a, s, amt + delta)
+                    variant[j] = (b, t, bmt + delta)
+                    yield variant, hint
+
+
+def _discount(lines: List[Line]) -> Iterator[Tuple[List[Line], str]]:
+    for d_i, (d_acc, d_side, d) in enumerate(lines):
+        if d_acc not in DISCOUNT_ACCOUNTS:
+            continue
+        flipped = lines[:d_i] + [(d_acc, _flip(d_side), d)] + lines[d_i + 1:]
+        for i, (a, s, amt) in enumerate(flipped):
+            if i == d_i:
+                continue
+            # Rebalance the flipped discount through one other line.
+            adjusted = amt + 2 * d if s == d_side else amt - 2 * d
+            yield flipped[:i] + [(a, s, adjusted)] + flipped[i + 1:], DISCOUNT_HINT
+
+
+def _wrong_account(lines: List[Line]) -> Iterator[Tuple[List[Line], str]]:
+    for i, (a, s, amt) in enumerate(lines):
+        for (used, wanted), hint in CONFUSED.items():
+            if wanted == a:
+                yield lines[:i] + [(used, s, amt)] + lines[i + 1:], hint
+
+
+GENERATORS = (_swapped, _missing_vat, _gross_net, _discount, _wrong_account)
+
+
+@functools.lru_cache(maxsize=4096)
+def hint_index(signature: Signature) -> Dict[Signature, str]:
+    # Earlier generators win when two mistakes produce the same entry.
+    lines = sorted(line for line, n in signature for _ in range(n))
+    index: Dict[Signature, str] = {}
+    for generate in GENERATORS:
+        for variant, hint in generate(lines):
+            if not _balanced(variant):
+                continue
+            sig = signature_of(variant)
+            if sig != signature and sig not in index:
+                index[sig] = hint
+    return index
+
+
+def precompute(keys: Iterable[AnswerKey]) -> int:
+    return sum(len(hint_index(k.signature)) for k in keys)
+
+
+@timed("diagnose")
+def diagnose(student: List[Posting], key: AnswerKey, expected: Optional[List[Posting]] = None) -> Optional[str]:
+    found = hint_index(key.signature).get(signature_of(canonical_line(p) for p in student))
+    if found is not None or expected is None:
+        return found
+    return generate_hint(student, expected)
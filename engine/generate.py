@@ -0,0 +1,118 @@
+import argparse
+import csv
+import io
+import itertools
+import json
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .parallel import bounded_map, default_workers, parse_range
+from .questions import build_round, round_amount_options
+
+
+# ----------------------------
+# Bulk question generator
+# ----------------------------
+# python -m engine.generate --rounds 1-20 --seeds 0-999 --format jsonl -o papers.jsonl
+#
+# Without --seeds the classic per-round seed is used, so the output matches
+# what players see in the app.
+
+CSV_FIELDS = ["seed", "round", "question", "prompt", "expected", "amount_options"]
+
+
+def round_records(task: Tuple[Optional[int], int, int]) -> List[Dict]:
+    seed, round_no, n = task
+    questions = build_round(round_no, n, seed=seed)
+    options = round_amount_options(round_no, questions, seed=seed)
+    return [
+        {
+            "seed": seed,
+            "round": round_no,
+            "question": i + 1,
+            "prompt": q.prompt,
+            "expected": [{"account": p.account, "side": p.side, "amount": p.amount} for p in q.expected],
+            "amount_options": opts,
+        }
+        for i, (q, opts) in enumerate(zip(questions, options))
+    ]
+
+
+def _csv_row(rec: Dict) -> Dict:
+    row = dict(rec)
+    row["seed"] = "" if rec["seed"] is None else rec["seed"]
+    row["expected"] = "; ".join(f'{e["side"]} {e["account"]} {e["amount"]}' for e in rec["expected"])
+    row["amount_options"] = ";".join(str(a) for a in rec["amount_options"])
+    return row
+
+
+def round_lines(task: Tuple[Optional[int], int, int, str]) -> str:
+    # Serialised in the worker so the parent only concatenates text.
+    seed, round_no, n, fmt = task
+    records = round_records((seed, round_no, n))
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=CSV_FIELDS)
+        for rec in records:
+            writer.writerow(_csv_row(rec))
+        return buf.getvalue()
+    return "".join(json.dumps(rec, ensure_ascii=False) + "\n" for rec in records)
+
+
+def iter_records(
+    rounds: Sequence[int],
+    seeds: Sequence[Optional[int]],
+    n: int = 10,
+    workers: Optional[int] = None,
+) -> Iterator[Dict]:
+    tasks = ((seed, r, n) for seed, r in itertools.product(seeds, rounds))
+    for records in bounded_map(round_records, tasks, workers=workers):
+        yield from records
+
+
+def write_stream(
+    out,
+    rounds: Sequence[int],
+    seeds: Sequence[Optional[int]],
+    n: int = 10,
+    fmt: str = "jsonl",
+    workers: Optional[int] = None,
+) -> int:
+    if fmt == "csv":
+        csv.DictWriter(out, fieldnames=CSV_FIELDS).writeheader()
+    tasks = ((seed, r, n, fmt) for seed, r in itertools.product(seeds, rounds))
+    count = 0
+    for text in bounded_map(round_lines, tasks, workers=workers):
+        out.write(text)
+        count += n
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m engine.generate", description="Stream generated questions as JSONL or CSV.")
+    parser.add_argument("--rounds", default="1-20", help='round range, e.g. "1-20" or "1,5,9-12"')
+    parser.add_argument("--seeds", default="", help='seed range, e.g. "0-999"; omit for the in-game seeds')
+    parser.add_argument("-n", "--questions", type=int, default=10, help="questions per round")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("-o", "--output", default="-", help="output file (default stdout)")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    args = parser.parse_args(argv)
+
+    rounds = parse_range(args.rounds)
+    seeds: Sequence[Optional[int]] = parse_range(args.seeds) if args.seeds else [None]
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    t0 = time.perf_counter()
+    try:
+        count = write_stream(out, rounds, seeds, args.questions, args.format, args.workers)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - t0
+    print(f"{count} questions in {elapsed:.2f}s ({count / elapsed if elapsed else 0:,.0f}/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
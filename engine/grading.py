@@ -0,0 +1,157 @@
+import argparse
+import csv
+import functools
+import json
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import bank
+from .ledger import Posting
+from .diagnostics import diagnose
+from .marking import mark
+from .parallel import bounded_map, default_workers
+from .questions import Question, build_round
+
+
+# ----------------------------
+# Batch marking of student journals
+# ----------------------------
+# python -m engine.grading submissions.jsonl -o results.jsonl --workers 8
+#
+# JSONL input, one submission per line:
+#   {"student_id": "s1", "round": 3, "question": 1, "seed": null,
+#    "postings": [{"side": "DR", "account": "Bank", "amount": 500}, ...]}
+# CSV input, one journal line per row; consecutive rows with the same
+# student_id/round/question (and optional seed) form one submission:
+#   student_id,round,question,side,account,amount
+
+NOT_MARKED_EMPTY = "Not marked. Please select at least two lines with accounts and amounts."
+NOT_MARKED_UNBALANCED = "Not marked. Your entry must balance before you submit."
+
+
+@functools.lru_cache(maxsize=4096)
+def _seeded_round(round_no: int, seed: int) -> Tuple[Question, ...]:
+    return tuple(build_round(round_no, bank.QUESTIONS_PER_ROUND, seed=seed))
+
+
+def question_for(round_no: int, question_no: int, seed: Optional[int] = None) -> Question:
+    # Checked before get_round: every round asked for is kept in the shared bank.
+    if round_no not in bank.ROUNDS:
+        raise ValueError(f"no round {round_no}; rounds are {bank.ROUNDS[0]} to {bank.ROUNDS[-1]}")
+    questions = bank.get_round(round_no).questions if seed is None else _seeded_round(round_no, seed)
+    if not 1 <= question_no <= len(questions):
+        raise ValueError(f"round {round_no} has no question {question_no}")
+    return questions[question_no - 1]
+
+
+def grade_submission(sub: Dict) -> Dict:
+    result = {
+        "student_id": sub.get("student_id"),
+        "round": sub.get("round"),
+        "question": sub.get("question"),
+    }
+    try:
+        q = question_for(int(sub["round"]), int(sub["question"]), sub.get("seed"))
+        postings = []
+        # Blank lines (no account or no amount) are dropped, as in the app.
+        for p in sub.get("postings", []):
+            if not (p.get("account") and int(p.get("amount") or 0) > 0):
+                continue
+            side = str(p.get("side")).upper().strip()
+            if side not in ("DR", "CR"):
+                raise ValueError(f"side must be DR or CR, got {p.get('side')!r}")
+            postings.append(Posting(account=str(p["account"]), side=side, amount=int(p["amount"])))
+    except (KeyError, TypeError, ValueError) as e:
+        result.update(status="error", correct=False, feedback=str(e), hint=None)
+        return result
+
+    dr_total = sum(p.amount for p in postings if p.side == "DR")
+    cr_total = sum(p.amount for p in postings if p.side == "CR")
+    if not postings:
+        result.update(status="not_marked", correct=False, feedback=NOT_MARKED_EMPTY, hint=None)
+    elif dr_total != cr_total:
+        result.update(status="not_marked", correct=False, feedback=NOT_MARKED_UNBALANCED, hint=None)
+    else:
+        ok, feedback = mark(postings, q.answer_key)
+        hint = None if ok else diagnose(postings, q.answer_key, q.expected)
+        result.update(status="correct" if ok else "incorrect", correct=ok, feedback=feedback, hint=hint)
+    return result
+
+
+# ----------------------------
+# Readers
+# ----------------------------
+
+def read_jsonl(lines: Iterable[str]) -> Iterator[Dict]:
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def read_csv(lines: Iterable[str]) -> Iterator[Dict]:
+    current: Optional[Dict] = None
+    key = None
+    for row in csv.DictReader(lines):
+        seed = row.get("seed") or None
+        row_key = (row["student_id"], row["round"], row["question"], seed)
+        if row_key != key:
+            if current is not None:
+                yield current
+            key = row_key
+            current = {
+                "student_id": row["student_id"],
+                "round": int(row["round"]),
+                "question": int(row["question"]),
+                "seed": int(seed) if seed is not None else None,
+                "postings": [],
+            }
+        current["postings"].append({"side": row["side"], "account": row["account"], "amount": row["amount"] or 0})
+    if current is not None:
+        yield current
+
+
+def grade_stream(submissions: Iterable[Dict], workers: Optional[int] = None, chunk_size: int = 256) -> Iterator[Dict]:
+    return bounded_map(grade_submission, submissions, workers=workers, chunk_size=chunk_size)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m engine.grading", description="Mark a file of student journals.")
+    parser.add_argument("input", help="submissions file (.jsonl or .csv), or - for JSONL on stdin")
+    parser.add_argument("-o", "--output", default="-", help="results JSONL (default stdout)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None, help="input format (default from extension)")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.input.endswith(".csv") else "jsonl")
+    src = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    counts: Dict[str, int] = {}
+    t0 = time.perf_counter()
+    try:
+        subs = read_csv(src) if fmt == "csv" else read_jsonl(src)
+        for res in grade_stream(subs, workers=args.workers):
+            counts[res["status"]] = counts.get(res["status"], 0) + 1
+            out.write(json.dumps(res, ensure_ascii=False))
+            out.write("\n")
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - t0
+    total = sum(counts.values())
+    summary = ", ".join(f"{k} {v}" for k, v in sorted(counts.items()))
+    print(
+        f"graded {total} submissions in {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f}/s, "
+        f"{args.workers} workers): {summary}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
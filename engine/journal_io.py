@@ -0,0 +1,343 @@
+import csv
+import functools
+import json
+import os
+from dataclasses import dataclass
+from itertools import zip_longest
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .ledger import T_COLUMNS, TB_COLUMNS, Cell, Posting, t_account_closing_rows
+from .profiling import timed
+from .reconcile import question_of
+
+
+# ----------------------------
+# Bulk journal import / export
+# ----------------------------
+# Journal files hold one posting per row: entry, account, side, amount and an
+# optional narrative. The rows of an entry are contiguous, and every row
+# needs an entry id: a file without the column, or a row with a blank id,
+# raises JournalError rather than being read as one endless entry. Files are
+# read one row at a time (Parquet one record batch at a time). Every entry is checked
+# on its own: at least one line, amounts positive, debits equal to credits
+# (the same rule as the journal editor's submit). Checked entries are handed
+# to post_many in chunks of about chunk_size postings. Memory stays at one
+# chunk plus the entry being read, whatever the size of the file.
+#
+# Exports stream the same way, from a Ledger or a CompactLedger. Postings and
+# T accounts are written straight from the accounts (a CompactLedger's
+# columns are read in place), never built as tables first.
+#
+# The posting export is a journal file that imports again. A ledger keeps no
+# entry ids, so its entries are rebuilt from the narratives: every line
+# tagged Qn (as the game tags each posted answer) is entry "Qn", and lines
+# without a tag, such as "Bal b/d" openings or imported narratives, make up
+# one entry "untagged". Re-importing gives the same accounts and balances,
+# with each account's lines in entry order. An untagged ledger re-imports as
+# a single entry, held in memory whole. Formats: csv, jsonl,
+# and parquet (needs the optional pyarrow).
+
+FORMATS = ("csv", "jsonl", "parquet")
+_EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet", ".pq": "parquet"}
+
+JOURNAL_COLUMNS = ("entry", "account", "side", "amount", "narrative")
+POSTING_COLUMNS = ("entry", "account", "line", "side", "amount", "narrative")
+UNTAGGED = "untagged"
+T_ACCOUNT_COLUMNS = ("Account",) + T_COLUMNS
+
+# Columns written as int64 in Parquet; blank (None) amounts are null there.
+_INT_COLUMNS = {"amount", "line", "Debit (£)", "Credit (£)"}
+
+
+class JournalError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class ImportReport:
+    entries: int
+    postings: int
+    chunks: int
+    rejected: int
+    errors: Tuple[str, ...]  # first max_errors problems, "row N: entry E: ..."
+
+
+def format_of(path: str, fmt: Optional[str] = None) -> str:
+    if fmt is None:
+        fmt = _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+        if fmt is None:
+            raise ValueError(f"Cannot tell the format of {path!r}; pass fmt= one of {', '.join(FORMATS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    return fmt
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet import and export need pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+# ----------------------------
+# Reading
+# ----------------------------
+
+def _no_entry_column(path: str) -> JournalError:
+    return JournalError(f"{path}: no 'entry' column; every row needs an entry id")
+
+
+def _csv_rows(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames is not None and "entry" not in reader.fieldnames:
+            raise _no_entry_column(path)
+        yield from reader
+
+
+def _jsonl_rows(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _parquet_rows(path: str, batch_size: int) -> Iterator[Dict[str, Any]]:
+    pa = _pyarrow()
+    pf = pa.parquet.ParquetFile(path)
+    if "entry" not in pf.schema_arrow.names:
+        raise _no_entry_column(path)
+    columns = [c for c in JOURNAL_COLUMNS if c in pf.schema_arrow.names]
+    for batch in pf.iter_batches(batch_size=batch_size, columns=columns):
+        data = batch.to_pydict()
+        for values in zip(*data.values()):
+            yield dict(zip(data, values))
+
+
+def read_journal_rows(path: str, fmt: Optional[str] = None, batch_size: int = 65536) -> Iterator[Dict[str, Any]]:
+    fmt = format_of(path, fmt)
+    if fmt == "csv":
+        return _csv_rows(path)
+    if fmt == "jsonl":
+        return _jsonl_rows(path)
+    return _parquet_rows(path, batch_size)
+
+
+def _posting(row: Dict[str, Any]) -> Posting:
+    account = str(row.get("account") or "").strip()
+    side = str(row.get("side") or "").upper().strip()
+    raw = row.get("amount")
+    if not account:
+        raise ValueError("account is missing")
+    if side not in ("DR", "CR"):
+        raise ValueError(f"side must be DR or CR, got {row.get('side')!r}")
+    try:
+        amount = int(str(raw).replace(",", "").replace("£", "").strip()) if not isinstance(raw, int) else raw
+    except ValueError:
+        raise ValueError(f"amount {raw!r} is not a whole number") from None
+    if amount <= 0:
+        raise ValueError(f"amount must be positive, got {amount}")
+    return Posting(account=account, side=side, amount=amount, narrative=str(row.get("narrative") or ""))
+
+
+def check_entry(postings: Sequence[Posting]) -> Optional[str]:
+    if not postings:
+        return "no lines"
+    dr_total = sum(p.amount for p in postings if p.side == "DR")
+    cr_total = sum(p.amount for p in postings if p.side == "CR")
+    if dr_total != cr_total:
+        return f"does not balance: Dr £{dr_total:,}, Cr £{cr_total:,}"
+    return None
+
+
+def iter_entries(rows: Iterable[Dict[str, Any]]) -> Iterator[Tuple[int, str, List[Posting], Optional[str]]]:
+    # (first row number, entry id, postings, problem or None) per run of rows
+    # sharing an entry id. A row that cannot be parsed spoils its entry; a
+    # row without an id raises, as entries could no longer be told apart.
+    current: Optional[str] = None
+    first = 0
+    postings: List[Posting] = []
+    problem: Optional[str] = None
+    for n, row in enumerate(rows, start=1):
+        raw = row.get("entry")
+        entry = "" if raw is None else str(raw).strip()
+        if not entry:
+            raise JournalError(f"row {n}: entry id is missing")
+        if entry != current:
+            if current is not None:
+                yield first, current, postings, problem or check_entry(postings)
+            current, first, postings, problem = entry, n, [], None
+        try:
+            postings.append(_posting(row))
+        except ValueError as e:
+            if problem is None:
+                problem = str(e) if n == first else f"row {n}: {e}"
+    if current is not None:
+        yield first, current, postings, problem or check_entry(postings)
+
+
+@timed("import_journal")
+def import_journal(
+    ledger: Any,
+    path: str,
+    fmt: Optional[str] = None,
+    chunk_size: int = 10000,
+    strict: bool = True,
+    max_errors: int = 20,
+) -> ImportReport:
+    # ledger is anything with post_many (Ledger or CompactLedger). With
+    # strict, the first bad entry raises JournalError; chunks posted before
+    # it stay posted. Otherwise bad entries are skipped and counted. A
+    # missing entry id raises either way.
+    entries = postings = chunks = rejected = 0
+    errors: List[str] = []
+    chunk: List[Posting] = []
+    for first, entry, lines, problem in iter_entries(read_journal_rows(path, fmt)):
+        if problem is not None:
+            message = f"row {first}: entry {entry!r}: {problem}"
+            if strict:
+                raise JournalError(f"{path}: {message}")
+            rejected += 1
+            if len(errors) < max_errors:
+                errors.append(message)
+            continue
+        chunk.extend(lines)
+        entries += 1
+        if len(chunk) >= chunk_size:
+            ledger.post_many(chunk)
+            postings += len(chunk)
+            chunks += 1
+            chunk = []
+    if chunk:
+        ledger.post_many(chunk)
+        postings += len(chunk)
+        chunks += 1
+    return ImportReport(entries=entries, postings=postings, chunks=chunks, rejected=rejected, errors=tuple(errors))
+
+
+# ----------------------------
+# Export rows
+# ----------------------------
+
+@functools.lru_cache(maxsize=4096)
+def entry_of(narrative: str) -> str:
+    q = question_of(narrative)
+    return UNTAGGED if q is None else f"Q{q}"
+
+
+def _entry_order(entry: str) -> Tuple[int, int]:
+    return (0, 0) if entry == UNTAGGED else (1, int(entry[1:]))
+
+
+def iter_posting_rows(ledger: Any) -> Iterator[Tuple[Cell, ...]]:
+    # Entry by entry (untagged first, then Q1, Q2, ...), one pass over the
+    # accounts for each; within an entry account by account, debits then
+    # credits. line is the T-account line.
+    names = ledger.used_account_names()
+    entries = {
+        entry_of(narrative)
+        for name in names
+        for want_debit in (True, False)
+        for narrative, _ in ledger.accounts[name].iter_lines(want_debit)
+    }
+    for entry in sorted(entries, key=_entry_order):
+        for name in names:
+            acc = ledger.accounts[name]
+            for want_debit, side in ((True, "DR"), (False, "CR")):
+                for i, (narrative, amount) in enumerate(acc.iter_lines(want_debit), start=1):
+                    if entry_of(narrative) == entry:
+                        yield entry, name, i, side, amount, narrative
+
+
+def iter_t_account_rows(acc: Any, include_balance_lines: bool = True) -> Iterator[Tuple[Cell, ...]]:
+    # Same rows as ledger.t_account_columns, produced one at a time.
+    for (dr_ref, dr_amt), (cr_ref, cr_amt) in zip_longest(acc.iter_lines(True), acc.iter_lines(False), fillvalue=("", None)):
+        yield dr_ref, dr_amt, cr_ref, cr_amt
+    yield from t_account_closing_rows(acc, include_balance_lines)
+
+
+def iter_t_accounts_rows(ledger: Any, include_balance_lines: bool = True) -> Iterator[Tuple[Cell, ...]]:
+    for name in ledger.used_account_names():
+        for row in iter_t_account_rows(ledger.accounts[name], include_balance_lines):
+            yield (name,) + row
+
+
+def iter_trial_balance_rows(ledger: Any) -> Iterator[Tuple[Cell, ...]]:
+    # One row per open account plus TOTAL; small, so the cached columns are reused.
+    return zip(*ledger.trial_balance_columns().values())
+
+
+# ----------------------------
+# Writing
+# ----------------------------
+
+def _write_csv(path: str, columns: Sequence[str], rows: Iterable[Sequence[Cell]]) -> int:
+    n = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(columns)
+        for row in rows:
+            w.writerow(row)
+            n += 1
+    return n
+
+
+def _write_jsonl(path: str, columns: Sequence[str], rows: Iterable[Sequence[Cell]]) -> int:
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+            f.write("\n")
+            n += 1
+    return n
+
+
+def _write_parquet(path: str, columns: Sequence[str], rows: Iterable[Sequence[Cell]], batch_size: int) -> int:
+    pa = _pyarrow()
+    ints = [c in _INT_COLUMNS for c in columns]
+    schema = pa.schema([(c, pa.int64() if is_int else pa.string()) for c, is_int in zip(columns, ints)])
+    buffers: List[List[Any]] = [[] for _ in columns]
+    n = 0
+
+    def flush(writer) -> None:
+        writer.write_batch(pa.record_batch([pa.array(b, type=f.type) for b, f in zip(buffers, schema)], schema=schema))
+        for b in buffers:
+            b.clear()
+
+    with pa.parquet.ParquetWriter(path, schema) as writer:
+        for row in rows:
+            for b, value, is_int in zip(buffers, row, ints):
+                b.append((None if value is None else int(value)) if is_int else str(value))
+            n += 1
+            if len(buffers[0]) >= batch_size:
+                flush(writer)
+        if buffers[0] or n == 0:
+            flush(writer)
+    return n
+
+
+def write_rows(path: str, columns: Sequence[str], rows: Iterable[Sequence[Cell]], fmt: Optional[str] = None,
+               batch_size: int = 65536) -> int:
+    fmt = format_of(path, fmt)
+    if fmt == "csv":
+        return _write_csv(path, columns, rows)
+    if fmt == "jsonl":
+        return _write_jsonl(path, columns, rows)
+    return _write_parquet(path, columns, rows, batch_size)
+
+
+@timed("export_postings")
+def export_postings(ledger: Any, path: str, fmt: Optional[str] = None) -> int:
+    return write_rows(path, POSTING_COLUMNS, iter_posting_rows(ledger), fmt)
+
+
+@timed("export_t_accounts")
+def export_t_accounts(ledger: Any, path: str, fmt: Optional[str] = None, include_balance_lines: bool = True) -> int:
+    return write_rows(path, T_ACCOUNT_COLUMNS, iter_t_accounts_rows(ledger, include_balance_lines), fmt)
+
+
+@timed("export_trial_balance")
+def export_trial_balance(ledger: Any, path: str, fmt: Optional[str] = None) -> int:
+    return write_rows(path, TB_COLUMNS, iter_trial_balance_rows(ledger), fmt)
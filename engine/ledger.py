@@ -0,0 +1,609 @@
+import itertools
+import os
+import sys
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, List, Dict, Optional, Set, Tuple, Union
+
+from .profiling import timed
+
+if TYPE_CHECKING:
+    from .statements import FinancialStatements
+
+# ENGINE_DEBUG=1 re-sums the raw lists on every totals() call and checks them
+# against the running totals kept by post().
+DEBUG = os.environ.get("ENGINE_DEBUG", "") == "1"
+
+
+# ----------------------------
+# Models
+# ----------------------------
+
+# Models are slotted: no per-instance __dict__, which matters with hundreds
+# of live sessions each holding a ledger.
+
+@dataclass(frozen=True, slots=True)
+class Posting:
+    account: str
+    side: str  # "DR" or "CR"
+    amount: int
+    narrative: str = ""
+
+
+@dataclass(slots=True)
+class LedgerAccount:
+    name: str
+    debits: List[Tuple[str, int]] = field(default_factory=list)   # (narrative, amount)
+    credits: List[Tuple[str, int]] = field(default_factory=list)
+    _dr_total: int = field(default=0, init=False, repr=False, compare=False)
+    _cr_total: int = field(default=0, init=False, repr=False, compare=False)
+    _balance: Tuple[str, int] = field(default=("", 0), init=False, repr=False, compare=False)
+    # prefix sums over debits/credits, extended lazily by running_balance()
+    _dr_prefix: List[int] = field(default_factory=lambda: [0], init=False, repr=False, compare=False)
+    _cr_prefix: List[int] = field(default_factory=lambda: [0], init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._dr_total = sum(a for _, a in self.debits)
+        self._cr_total = sum(a for _, a in self.credits)
+        self._balance = _balance_of(self._dr_total, self._cr_total)
+
+    def iter_lines(self, want_debit: bool) -> Iterator[Tuple[str, int]]:
+        return iter(self.debits if want_debit else self.credits)
+
+    def post(self, side: str, amount: int, narrative: str = "") -> None:
+        s = side.upper().strip()
+        # Every player of a round posts the same narratives; share one copy per process.
+        narrative = sys.intern(narrative)
+        if s == "DR":
+            self.debits.append((narrative, amount))
+            self._dr_total += amount
+        elif s == "CR":
+            self.credits.append((narrative, amount))
+            self._cr_total += amount
+        else:
+            raise ValueError("Side must be DR or CR")
+        self._balance = _balance_of(self._dr_total, self._cr_total)
+
+    def totals(self) -> Tuple[int, int]:
+        if DEBUG:
+            self.check_totals()
+        return self._dr_total, self._cr_total
+
+    def balance(self) -> Tuple[str, int]:
+        if DEBUG:
+            self.check_totals()
+        return self._balance
+
+    def _prefix(self, lines: List[Tuple[str, int]], prefix: List[int], i: int) -> int:
+        i = min(i, len(lines))
+        if i >= len(prefix):
+            run = prefix[-1]
+            for _, a in lines[len(prefix) - 1:]:
+                run += a
+                prefix.append(run)
+        return prefix[i]
+
+    def running_balance(self, row: int) -> Tuple[str, int]:
+        # Balance of the first `row` T-account lines (debit i and credit i share line i).
+        dr = self._prefix(self.debits, self._dr_prefix, row)
+        cr = self._prefix(self.credits, self._cr_prefix, row)
+        return _balance_of(dr, cr)
+
+    def line_count(self) -> int:
+        return max(len(self.debits), len(self.credits))
+
+    def truncate(self, n_dr: int, n_cr: int) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+        # Drop every debit after the first n_dr and credit after the first
+        # n_cr; returns the dropped lines. O(lines dropped).
+        dr_tail = self.debits[n_dr:]
+        cr_tail = self.credits[n_cr:]
+        del self.debits[n_dr:]
+        del self.credits[n_cr:]
+        self._dr_total -= sum(a for _, a in dr_tail)
+        self._cr_total -= sum(a for _, a in cr_tail)
+        del self._dr_prefix[n_dr + 1:]
+        del self._cr_prefix[n_cr + 1:]
+        self._balance = _balance_of(self._dr_total, self._cr_total)
+        return dr_tail, cr_tail
+
+    def check_totals(self) -> None:
+        dr = sum(a for _, a in self.debits)
+        cr = sum(a for _, a in self.credits)
+        if (dr, cr) != (self._dr_total, self._cr_total):
+            raise AssertionError(
+                f"{self.name}: running totals {self._dr_total}/{self._cr_total} "
+                f"do not match postings {dr}/{cr}"
+            )
+
+
+def _balance_of(dr: int, cr: int) -> Tuple[str, int]:
+    if dr > cr:
+        return "DR", dr - cr
+    if cr > dr:
+        return "CR", cr - dr
+    return "", 0
+
+
+Cell = Union[str, int, None]
+Columns = Dict[str, List[Cell]]
+
+# Batch history: each post_many is kept as (serial, line counts before it
+# of only the accounts it touched, None for accounts it created). Account
+# lists only ever grow between undos, so a snapshot is just the serial of
+# the newest batch: every snapshot shares the live lists, taking one is
+# O(1), and undoing a batch is O(accounts it touched + lines it added).
+# Serials are unique across ledgers, so a snapshot restores only into the
+# ledger and branch of history it came from.
+HISTORY_LIMIT = 100
+_SERIALS = itertools.count(1)
+_Before = Dict[str, Optional[Tuple[int, int]]]
+_Lines = List[Tuple[str, int]]
+
+
+@dataclass(frozen=True, slots=True)
+class LedgerSnapshot:
+    serial: int
+    version: int
+
+
+class Ledger:
+    # Post through post_many(): it bumps `version` and marks the touched
+    # accounts dirty, which is what keeps the render caches below honest.
+    # A batch is all or nothing: if one posting is bad, none stay posted.
+    # Listeners get posted(postings) after every batch, reverted(postings)
+    # when undo() takes a batch back, and rebuilt(ledger) when the accounts
+    # are replaced wholesale (period close).
+    __slots__ = ("accounts", "version", "_dirty", "_names_cache", "_tb_cache", "_t_cache", "_listeners", "_statements",
+                 "_history", "_redo", "_floor")
+
+    def __init__(self) -> None:
+        self.accounts: Dict[str, LedgerAccount] = {}
+        self.version = 0
+        self._dirty: Set[str] = set()
+        self._names_cache: Optional[Tuple[int, List[str]]] = None
+        self._tb_cache: Optional[Tuple[int, Columns]] = None
+        self._t_cache: Dict[Tuple[str, bool], Columns] = {}
+        self._listeners: List[Any] = []
+        self._statements: Optional["FinancialStatements"] = None
+        self._history: List[Tuple[int, _Before]] = []
+        self._redo: List[Tuple[int, Dict[str, Tuple[Optional[Tuple[int, int]], _Lines, _Lines]]]] = []
+        self._floor = next(_SERIALS)  # serial of the oldest state undo can reach
+
+    def subscribe(self, listener: Any) -> None:
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Any) -> None:
+        self._listeners.remove(listener)
+
+    def statements(self) -> "FinancialStatements":
+        # Built from one scan on first use, then kept current by post_many.
+        if self._statements is None:
+            from .statements import FinancialStatements
+
+            self._statements = FinancialStatements(self)
+            self.subscribe(self._statements)
+        return self._statements
+
+    def get(self, name: str) -> LedgerAccount:
+        key = name.strip()
+        if key not in self.accounts:
+            self.accounts[key] = LedgerAccount(name=key)
+        return self.accounts[key]
+
+    def post_many(self, postings: List[Posting]) -> None:
+        touched = self._dirty
+        before: _Before = {}
+        accounts = self.accounts
+        try:
+            for p in postings:
+                acc = accounts.get(p.account)
+                if acc is None:
+                    key = p.account.strip()
+                    if key not in accounts:
+                        before[key] = None
+                    acc = self.get(key)
+                name = acc.name
+                if name not in before:
+                    before[name] = (len(acc.debits), len(acc.credits))
+                acc.post(p.side, p.amount, p.narrative)
+                touched.add(name)
+        except BaseException:
+            # All or nothing: a bad posting takes back the lines before it.
+            self._cut_back(before)
+            raise
+        if postings:
+            self._push(next(_SERIALS), before)
+            self._redo.clear()
+            self.version += 1
+            for listener in self._listeners:
+                listener.posted(postings)
+
+    # Snapshots, undo and redo (see HISTORY_LIMIT above)
+
+    def _push(self, serial: int, before: _Before) -> None:
+        self._history.append((serial, before))
+        if len(self._history) > HISTORY_LIMIT:
+            self._floor = self._history.pop(0)[0]
+
+    def _cut_back(self, before: _Before) -> None:
+        # Truncates each account to its recorded counts; drops the new ones.
+        for name, counts in before.items():
+            self.accounts[name].truncate(*(counts or (0, 0)))
+            if counts is None:
+                del self.accounts[name]
+            self._t_cache.pop((name, True), None)
+            self._t_cache.pop((name, False), None)
+
+    def _top(self) -> int:
+        return self._history[-1][0] if self._history else self._floor
+
+    def can_undo(self) -> bool:
+        return bool(self._history)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def snapshot(self) -> LedgerSnapshot:
+        return LedgerSnapshot(serial=self._top(), version=self.version)
+
+    def undo(self) -> List[Posting]:
+        # Takes back the newest post_many batch; returns its postings
+        # (account by account, not in the original order). [] if none.
+        if not self._history:
+            return []
+        serial, before = self._history.pop()
+        tails = {}
+        undone: List[Posting] = []
+        for name, counts in before.items():
+            dr_tail, cr_tail = self.accounts[name].truncate(*(counts or (0, 0)))
+            if counts is None:
+                del self.accounts[name]
+            tails[name] = (counts, dr_tail, cr_tail)
+            self._dirty.add(name)
+            undone += [Posting(name, "DR", a, n) for n, a in dr_tail]
+            undone += [Posting(name, "CR", a, n) for n, a in cr_tail]
+        self._redo.append((serial, tails))
+        self.version += 1
+        for listener in self._listeners:
+            listener.reverted(undone)
+        return undone
+
+    def redo(self) -> List[Posting]:
+        if not self._redo:
+            return []
+        serial, tails = self._redo.pop()
+        before: _Before = {}
+        redone: List[Posting] = []
+        for name, (counts, dr_tail, cr_tail) in tails.items():
+            acc = self.get(name)
+            for n, a in dr_tail:
+                acc.post("DR", a, n)
+            for n, a in cr_tail:
+                acc.post("CR", a, n)
+            before[name] = counts
+            self._dirty.add(name)
+            redone += [Posting(name, "DR", a, n) for n, a in dr_tail]
+            redone += [Posting(name, "CR", a, n) for n, a in cr_tail]
+        self._push(serial, before)
+        self.version += 1
+        for listener in self._listeners:
+            listener.posted(redone)
+        return redone
+
+    def restore(self, snapshot: LedgerSnapshot) -> int:
+        # Undoes back to the snapshot; the batches undone can be redone.
+        # Returns how many batches were undone.
+        serials = {s for s, _ in self._history}
+        if snapshot.serial != self._floor and snapshot.serial not in serials:
+            raise ValueError("Snapshot is not in this ledger's undo history")
+        n = 0
+        while self._top() != snapshot.serial:
+            self.undo()
+            n += 1
+        return n
+
+    @contextmanager
+    def preview(self, postings: List[Posting]) -> Iterator["Ledger"]:
+        # What-if: the accounts show `postings` inside the block and are cut
+        # back on exit. Nothing is recorded for undo, `version` does not move
+        # and listeners are not told, so the caches keyed by version (and
+        # statements()) stay those of the real ledger. Costs O(postings).
+        version, dirty, history, floor = self.version, set(self._dirty), self._history[:], self._floor
+        names_cache, tb_cache = self._names_cache, self._tb_cache
+        self._names_cache = self._tb_cache = None
+        before: _Before = {}
+        accounts = self.accounts
+        try:
+            for p in postings:
+                key = p.account.strip()
+                acc = accounts.get(key)
+                if acc is None:
+                    before[key] = None
+                    acc = self.get(key)
+                elif key not in before:
+                    before[key] = (len(acc.debits), len(acc.credits))
+                acc.post(p.side, p.amount, p.narrative)
+                self._dirty.add(key)
+            yield self
+        finally:
+            self._cut_back(before)
+            self.version, self._dirty, self._history, self._floor = version, dirty, history, floor
+            self._names_cache, self._tb_cache = names_cache, tb_cache
+
+    def to_dict(self) -> Dict[str, Dict[str, List[List[Union[str, int]]]]]:
+        return {
+            name: {"debits": [list(d) for d in a.debits], "credits": [list(c) for c in a.credits]}
+            for name, a in self.accounts.items()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Dict[str, List[List[Union[str, int]]]]]) -> "Ledger":
+        ledger = cls()
+        for name, a in data.items():
+            ledger.accounts[name] = LedgerAccount(
+                name=name,
+                debits=[(sys.intern(str(n)), int(v)) for n, v in a.get("debits", [])],
+                credits=[(sys.intern(str(n)), int(v)) for n, v in a.get("credits", [])],
+            )
+        return ledger
+
+    def clear_render_cache(self) -> None:
+        self._names_cache = None
+        self._tb_cache = None
+        self._t_cache.clear()
+        self._dirty.clear()
+
+    def _flush_dirty(self) -> None:
+        for name in self._dirty:
+            self._t_cache.pop((name, True), None)
+            self._t_cache.pop((name, False), None)
+        self._dirty.clear()
+
+    def used_account_names(self) -> List[str]:
+        cached = self._names_cache
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        names: List[str] = []
+        for n, a in self.accounts.items():
+            if a.debits or a.credits:
+                names.append(n)
+        names.sort()
+        self._names_cache = (self.version, names)
+        return names
+
+    @timed("trial_balance_columns")
+    def trial_balance_columns(self) -> Columns:
+        cached = self._tb_cache
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        cols = trial_balance_columns_for((name, self.accounts[name]) for name in self.used_account_names())
+        self._tb_cache = (self.version, cols)
+        return cols
+
+    @timed("t_account_columns")
+    def t_account_columns(self, name: str, include_balance_lines: bool = True) -> Columns:
+        # IMPORTANT: using get() makes this safe even if an account doesn't exist yet
+        acc = self.get(name)
+        if self._dirty:
+            self._flush_dirty()
+        key = (acc.name, include_balance_lines)
+        cols = self._t_cache.get(key)
+        if cols is None:
+            cols = t_account_columns(acc, include_balance_lines)
+            self._t_cache[key] = cols
+        return cols
+
+    @timed("t_account_window")
+    def t_account_window(self, name: str, offset: int = 0, limit: int = 50) -> "TAccountWindow":
+        acc = self.get(name)
+        n = acc.line_count()
+        offset = max(0, min(offset, n))
+        end = min(n, offset + max(0, limit))
+        return TAccountWindow(
+            name=acc.name,
+            offset=offset,
+            end=end,
+            line_count=n,
+            opening=acc.running_balance(offset),
+            closing=acc.running_balance(end),
+            columns=t_account_window_columns(acc, offset, end),
+        )
+
+    def trial_balance_rows(self) -> List[Dict[str, Cell]]:
+        return rows_from_columns(self.trial_balance_columns())
+
+    def t_account_table_rows(self, name: str, include_balance_lines: bool = True) -> List[Dict[str, Cell]]:
+        return rows_from_columns(self.t_account_columns(name, include_balance_lines))
+
+    def close_period(self, capital: str = "Capital", archive: Optional[str] = None, label: str = "") -> "PeriodClose":
+        # Income, expense and drawings balances go to capital; every other
+        # balance becomes one "Bal b/d" line. The detail is appended to
+        # `archive` (JSONL) first, so afterwards the ledger holds one line per
+        # open account and later reruns only pay for the new period.
+        from .accounts import classify, closes_to_capital
+
+        closed: Dict[str, Tuple[str, int]] = {}
+        carried: Dict[str, int] = {}  # signed: DR positive
+        to_capital = 0
+        profit = 0
+        archived = 0
+        for name, acc in self.accounts.items():
+            archived += len(acc.debits) + len(acc.credits)
+            side, amt = acc.balance()
+            signed = amt if side == "DR" else -amt
+            if name != capital and closes_to_capital(name):
+                if amt:
+                    closed[name] = (side, amt)
+                to_capital += signed
+                if classify(name).statement == "income":
+                    profit -= signed
+            elif signed or name == capital:
+                carried[name] = signed
+        carried[capital] = carried.get(capital, 0) + to_capital
+
+        result = PeriodClose(
+            label=label,
+            profit=profit,
+            closed=closed,
+            carried={n: _balance_of(max(s, 0), max(-s, 0)) for n, s in carried.items() if s},
+            postings_archived=archived,
+        )
+        if archive:
+            append_archive(archive, result, self.to_dict())
+
+        self.accounts = {}
+        for name, signed in carried.items():
+            if signed:
+                self.get(name).post("DR" if signed > 0 else "CR", abs(signed), OPENING_NARRATIVE)
+        # The closed period is archived, not undoable.
+        self._history.clear()
+        self._redo.clear()
+        self._floor = next(_SERIALS)
+        self.clear_render_cache()
+        self.version += 1
+        for listener in self._listeners:
+            listener.rebuilt(self)
+        return result
+
+
+# ----------------------------
+# Period close
+# ----------------------------
+
+OPENING_NARRATIVE = "Bal b/d"
+
+
+@dataclass(frozen=True)
+class PeriodClose:
+    label: str
+    profit: int                          # income less expenses; negative is a loss
+    closed: Dict[str, Tuple[str, int]]   # balances emptied into capital
+    carried: Dict[str, Tuple[str, int]]  # opening balances of the next period
+    postings_archived: int
+
+
+def append_archive(path: str, close: PeriodClose, postings: Dict[str, Dict[str, List[List[Union[str, int]]]]]) -> None:
+    import json
+    import time
+
+    record = {
+        "label": close.label,
+        "closed_at": time.time(),
+        "profit": close.profit,
+        "closed": close.closed,
+        "carried": close.carried,
+        "ledger": postings,
+    }
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n")
+
+
+def read_archive(path: str) -> Iterator[Dict]:
+    import json
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# ----------------------------
+# Table builders (shared by every ledger backend)
+# ----------------------------
+# Built column-wise (dict of lists) so st.dataframe can take them as they are.
+# Blank amount cells are None, never "", so amount columns convert to Arrow
+# as nullable int64 instead of failing and falling back to a slow rewrite.
+
+TB_COLUMNS = ("Account", "Debit (£)", "Credit (£)")
+T_COLUMNS = ("Debit (ref)", "Debit (£)", "Credit (ref)", "Credit (£)")
+
+
+def rows_from_columns(cols: Columns) -> List[Dict[str, Cell]]:
+    keys = list(cols)
+    return [dict(zip(keys, vals)) for vals in zip(*cols.values())]
+
+
+def trial_balance_columns_for(accounts: Iterable[Tuple[str, "LedgerAccount"]]) -> Columns:
+    names: List[Cell] = []
+    drs: List[Cell] = []
+    crs: List[Cell] = []
+    total_dr = 0
+    total_cr = 0
+    for name, acc in accounts:
+        side, amt = acc.balance()
+        dr = int(amt) if side == "DR" else 0
+        cr = int(amt) if side == "CR" else 0
+        names.append(name)
+        drs.append(dr)
+        crs.append(cr)
+        total_dr += dr
+        total_cr += cr
+
+    names.append("TOTAL")
+    drs.append(total_dr)
+    crs.append(total_cr)
+    return dict(zip(TB_COLUMNS, (names, drs, crs)))
+
+
+def trial_balance_rows_for(accounts: Iterable[Tuple[str, "LedgerAccount"]]) -> List[Dict[str, Cell]]:
+    return rows_from_columns(trial_balance_columns_for(accounts))
+
+
+def t_account_closing_rows(acc: "LedgerAccount", include_balance_lines: bool = True) -> List[Tuple[Cell, Cell, Cell, Cell]]:
+    # The rows under the posted lines: Bal c/d, Total, Bal b/d (or just Total).
+    dr_total, cr_total = acc.totals()
+    bal_side, bal_amt = acc.balance()
+    if not (include_balance_lines and bal_side and bal_amt):
+        return [("Total", dr_total, "Total", cr_total)]
+    if bal_side == "DR":
+        return [("", None, "Bal c/d", bal_amt), ("Total", dr_total, "Total", cr_total + bal_amt), ("Bal b/d", bal_amt, "", None)]
+    return [("Bal c/d", bal_amt, "", None), ("Total", dr_total + bal_amt, "Total", cr_total), ("", None, "Bal b/d", bal_amt)]
+
+
+def t_account_columns(acc: "LedgerAccount", include_balance_lines: bool = True) -> Columns:
+    debits = list(acc.debits)
+    credits = list(acc.credits)
+    n_dr = len(debits)
+    n_cr = len(credits)
+    pad = max(n_dr, n_cr)
+
+    dr_ref: List[Cell] = [r for r, _ in debits] + [""] * (pad - n_dr)
+    dr_amt: List[Cell] = [a for _, a in debits] + [None] * (pad - n_dr)
+    cr_ref: List[Cell] = [r for r, _ in credits] + [""] * (pad - n_cr)
+    cr_amt: List[Cell] = [a for _, a in credits] + [None] * (pad - n_cr)
+
+    for a, b, c, d in t_account_closing_rows(acc, include_balance_lines):
+        dr_ref.append(a)
+        dr_amt.append(b)
+        cr_ref.append(c)
+        cr_amt.append(d)
+
+    return dict(zip(T_COLUMNS, (dr_ref, dr_amt, cr_ref, cr_amt)))
+
+
+@dataclass(frozen=True)
+class TAccountWindow:
+    name: str
+    offset: int                 # first line shown
+    end: int                    # one past the last line shown
+    line_count: int             # lines in the whole account
+    opening: Tuple[str, int]    # running balance brought forward to `offset`
+    closing: Tuple[str, int]    # running balance carried forward from `end`
+    columns: Columns
+
+
+def t_account_window_columns(acc: "LedgerAccount", start: int, end: int) -> Columns:
+    debits = acc.debits[start:end]
+    credits = acc.credits[start:end]
+    pad = end - start
+    return dict(zip(T_COLUMNS, (
+        [r for r, _ in debits] + [""] * (pad - len(debits)),
+        [a for _, a in debits] + [None] * (pad - len(debits)),
+        [r for r, _ in credits] + [""] * (pad - len(credits)),
+        [a for _, a in credits] + [None] * (pad - len(credits)),
+    )))
+
+
+def t_account_rows(acc: "LedgerAccount", include_balance_lines: bool = True) -> List[Dict[str, Cell]]:
+    return rows_from_columns(t_account_columns(acc, include_balance_lines))
@@ -0,0 +1,79 @@
+from collections import Counter
+from typing import Iterable, List, Tuple, Optional, Union
+
+from .ledger import Posting
+from .profiling import timed
+
+
+# ----------------------------
+# Marking + hints
+# ----------------------------
+
+Line = Tuple[str, str, int]
+
+
+def canonical_line(p: Posting) -> Line:
+    return p.account.strip(), p.side.upper().strip(), p.amount
+
+
+def canonical(postings: List[Posting]) -> List[Line]:
+    return sorted(canonical_line(p) for p in postings)
+
+
+class AnswerKey:
+    # Canonical multiset of expected lines, built once per Question.
+    __slots__ = ("counts", "signature")
+
+    def __init__(self, postings: Iterable[Posting]) -> None:
+        self.counts: Counter = Counter(canonical_line(p) for p in postings)
+        self.signature = frozenset(self.counts.items())
+
+    def matches(self, student_counts: Counter) -> bool:
+        return student_counts == self.counts
+
+
+def answer_key(expected: Union[List[Posting], AnswerKey]) -> AnswerKey:
+    return expected if isinstance(expected, AnswerKey) else AnswerKey(expected)
+
+
+@timed("mark")
+def mark(student: List[Posting], expected: Union[List[Posting], AnswerKey]) -> Tuple[bool, str]:
+    key = answer_key(expected)
+    s = Counter(canonical_line(p) for p in student)
+    if key.matches(s):
+        return True, ""
+
+    missing = sorted((key.counts - s).elements())
+    extra = sorted((s - key.counts).elements())
+
+    lines: List[str] = []
+    if missing:
+        lines.append("Missing lines")
+        for a, side, amt in missing:
+            lines.append(f"{side} {a} {amt:,}")
+    if extra:
+        lines.append("Incorrect extra lines")
+        for a, side, amt in extra:
+            lines.append(f"{side} {a} {amt:,}")
+
+    return False, "\n".join(lines)
+
+
+@timed("generate_hint")
+def generate_hint(student: List[Posting], expected: List[Posting]) -> Optional[str]:
+    s_acc = sorted([p.account for p in student])
+    e_acc = sorted([p.account for p in expected])
+
+    if sorted(set(s_acc)) == sorted(set(e_acc)):
+        s_pairs = sorted((p.account, p.side) for p in student)
+        e_pairs = sorted((p.account, p.side) for p in expected)
+        if sorted(set(a for a, _ in s_pairs)) == sorted(set(a for a, _ in e_pairs)) and s_pairs != e_pairs:
+            return "Hint: You have the right accounts, but one or more are on the wrong side (Dr or Cr)."
+        return "Hint: The right accounts are there, but check amounts and whether VAT or discounts are treated correctly."
+
+    e_has_vat = any("VAT" in p.account for p in expected)
+    s_has_vat = any("VAT" in p.account for p in student)
+    if e_has_vat and not s_has_vat:
+        return "Hint: This looks like a VAT question. Are you missing VAT input or VAT output?"
+
+    return None
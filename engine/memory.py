@@ -0,0 +1,65 @@
+import sys
+from array import array
+from typing import Any, Dict, Mapping, Optional, Set
+
+# ----------------------------
+# Deep object sizes
+# ----------------------------
+# sys.getsizeof counts one object; deep_sizeof walks everything reachable
+# through containers, instance __dict__s and __slots__, counting each object
+# once. Classes, functions and modules are shared code, not session data, and
+# are skipped. Walks with an explicit stack so a long ledger cannot hit the
+# recursion limit.
+
+_SKIP = (type, type(sys), type(len), type(lambda: None))
+_ATOMIC = (str, bytes, bytearray, int, float, complex, bool, type(None), array, range)
+
+
+def _slot_names(cls: type):
+    for klass in cls.__mro__:
+        slots = klass.__dict__.get("__slots__", ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        for name in slots:
+            if name not in ("__dict__", "__weakref__"):
+                yield name
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    if seen is None:
+        seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _SKIP):
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, _ATOMIC):
+            continue
+        if isinstance(o, Mapping):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+            continue
+        if isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+            continue
+        d = getattr(o, "__dict__", None)
+        if d is not None:
+            stack.append(d)
+        for name in _slot_names(type(o)):
+            try:
+                stack.append(getattr(o, name))
+            except AttributeError:
+                pass
+    return total
+
+
+def session_footprint(state: Mapping[str, Any]) -> Dict[str, int]:
+    # Bytes per top-level key plus "total". Objects reachable from several
+    # keys are charged to the first key that reaches them, so keys sum to total.
+    seen: Set[int] = set()
+    sizes = {str(k): deep_sizeof(v, seen) for k, v in state.items()}
+    sizes["total"] = sum(sizes.values())
+    return sizes
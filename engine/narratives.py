@@ -0,0 +1,41 @@
+from typing import List
+
+from .ledger import Posting
+
+
+# ----------------------------
+# Narratives: show from/to contra accounts
+# ----------------------------
+
+def _compact(accounts: List[str], limit: int = 2) -> str:
+    uniq: List[str] = []
+    for a in accounts:
+        if a not in uniq:
+            uniq.append(a)
+    if not uniq:
+        return ""
+    if len(uniq) <= limit:
+        return " & ".join(uniq)
+    return "Various"
+
+
+def annotate_with_from_to(postings: List[Posting], q_no: int) -> List[Posting]:
+    debits = [p.account for p in postings if p.side.upper() == "DR"]
+    credits = [p.account for p in postings if p.side.upper() == "CR"]
+
+    cr_text = _compact(credits)
+    dr_text = _compact(debits)
+
+    out: List[Posting] = []
+    for p in postings:
+        side = p.side.upper()
+        if side == "DR":
+            nar = f"Q{q_no} from {cr_text}" if cr_text else f"Q{q_no}"
+        else:
+            nar = f"Q{q_no} to {dr_text}" if dr_text else f"Q{q_no}"
+        out.append(Posting(account=p.account, side=side, amount=p.amount, narrative=nar))
+    return out
+
+
+def format_journal(postings: List[Posting]) -> str:
+    return "\n".join(f"{p.side.title()} {p.account} {p.amount:,}" for p in postings)
@@ -0,0 +1,73 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+# ----------------------------
+# Bounded, ordered process-pool map
+# ----------------------------
+# Unlike Executor.map, only `window` batches are ever in flight, so a
+# generator of millions of tasks is consumed lazily and memory stays flat.
+# Results come back in input order.
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def parse_range(spec: str) -> List[int]:
+    # "1-20", "3", "1,4,10-12" (non-negative, inclusive)
+    out: List[int] = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            out.extend(range(int(lo), int(hi) + 1))
+        else:
+            out.append(int(part))
+    return out
+
+
+def _chunks(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    chunk: List[T] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _run_chunk(fn: Callable[[T], R], chunk: List[T]) -> List[R]:
+    return [fn(item) for item in chunk]
+
+
+def bounded_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    window: Optional[int] = None,
+) -> Iterator[R]:
+    workers = workers or default_workers()
+    if workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    window = window or workers * 4
+    pending: Deque = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in _chunks(items, chunk_size):
+            pending.append(pool.submit(_run_chunk, fn, chunk))
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
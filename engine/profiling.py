@@ -0,0 +1,263 @@
+import functools
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+
+# ----------------------------
+# Opt-in instrumentation
+# ----------------------------
+# ENGINE_PROFILE=1      turn timers and counters on at start-up (or call enable())
+# ENGINE_PROFILE_LOG=p  append one JSON line per finished rerun to file p
+#
+# Disabled, a timed function costs one flag check and a section is a shared
+# no-op context manager. Enabled, every timer feeds process-wide totals and,
+# on the thread running a rerun, that rerun's own breakdown.
+
+ENABLED = os.environ.get("ENGINE_PROFILE", "") == "1"
+LOG_PATH = os.environ.get("ENGINE_PROFILE_LOG", "")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class Timer:
+    count: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+
+    def add(self, elapsed: float) -> None:
+        self.count += 1
+        self.total_s += elapsed
+        if elapsed > self.max_s:
+            self.max_s = elapsed
+
+
+@dataclass
+class RerunProfile:
+    label: str
+    started: float
+    total_s: float = 0.0
+    sections: Dict[str, float] = field(default_factory=dict)
+    counters: Dict[str, int] = field(default_factory=dict)
+    cprofile_text: str = ""
+    memory_top: List[str] = field(default_factory=list)
+    memory_peak_bytes: int = 0
+
+
+_lock = threading.Lock()
+_timers: Dict[str, Timer] = {}
+_counters: Dict[str, int] = {}
+_local = threading.local()
+
+
+def enable(on: bool = True) -> None:
+    global ENABLED
+    ENABLED = on
+
+
+def reset() -> None:
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def record(name: str, elapsed: float) -> None:
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = Timer()
+        timer.add(elapsed)
+    current = getattr(_local, "rerun", None)
+    if current is not None:
+        current.sections[name] = current.sections.get(name, 0.0) + elapsed
+
+
+def count(name: str, n: int = 1) -> None:
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+    current = getattr(_local, "rerun", None)
+    if current is not None:
+        current.counters[name] = current.counters.get(name, 0) + n
+
+
+def timed(name: Optional[str] = None) -> Callable[[F], F]:
+    def decorate(fn: F) -> F:
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(label, time.perf_counter() - t0)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+class _Section:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.t0 = 0.0
+
+    def __enter__(self) -> "_Section":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        record(self.name, time.perf_counter() - self.t0)
+
+
+class _NullSection:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NULL_SECTION = _NullSection()
+
+
+def section(name: str):
+    return _Section(name) if ENABLED else _NULL_SECTION
+
+
+# ----------------------------
+# Per-rerun capture
+# ----------------------------
+# begin_rerun() at the top of the script, end_rerun() wherever it finishes
+# (including just before st.stop()/st.rerun()). on_click callbacks run before
+# the script, so they call begin_callback(): it starts the capture early and
+# the script's begin_rerun() then keeps it, so the callback's work is part of
+# the rerun it triggers. tracemalloc traces the whole process, so with
+# several live sessions its numbers include their work too.
+
+def begin_callback(label: str = "rerun", cprofile: bool = False, memory: bool = False) -> None:
+    if not getattr(_local, "from_callback", False):
+        begin_rerun(label, cprofile, memory)
+        _local.from_callback = True
+
+
+def begin_rerun(label: str = "rerun", cprofile: bool = False, memory: bool = False) -> None:
+    if getattr(_local, "from_callback", False):
+        _local.from_callback = False
+        return
+    _local.rerun = None
+    _local.profiler = None
+    _local.memory = False
+    _local.tracing = False
+    if not ENABLED:
+        return
+    _local.rerun = RerunProfile(label=label, started=time.time())
+    if cprofile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            _local.profiler = profiler
+        except ValueError:  # another profiler is already active
+            pass
+    if memory:
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _local.tracing = True
+        tracemalloc.reset_peak()
+        _local.memory = True
+    _local.t0 = time.perf_counter()
+
+
+def end_rerun(top: int = 25) -> Optional[RerunProfile]:
+    current = getattr(_local, "rerun", None)
+    if current is None:
+        return None
+    _local.rerun = None
+    current.total_s = time.perf_counter() - _local.t0
+
+    profiler = getattr(_local, "profiler", None)
+    if profiler is not None:
+        import io
+        import pstats
+
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+        current.cprofile_text = out.getvalue()
+        _local.profiler = None
+
+    if _local.memory:
+        import tracemalloc
+
+        stats = tracemalloc.take_snapshot().statistics("lineno")[:top]
+        current.memory_top = [str(s) for s in stats]
+        current.memory_peak_bytes = tracemalloc.get_traced_memory()[1]
+        if _local.tracing:
+            tracemalloc.stop()
+        _local.memory = _local.tracing = False
+
+    record(current.label, current.total_s)
+    if LOG_PATH:
+        write_jsonl(LOG_PATH, current)
+    return current
+
+
+# ----------------------------
+# Export
+# ----------------------------
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "timers": {k: asdict(v) for k, v in sorted(_timers.items())},
+            "counters": dict(sorted(_counters.items())),
+        }
+
+
+def _label(name: str) -> str:
+    return name.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def prometheus_text(prefix: str = "engine") -> str:
+    # Each metric family is emitted as one block, as the exposition format requires.
+    snap = snapshot()
+    lines: List[str] = []
+    for metric, kind, key, fmt in (
+        ("timer_calls_total", "counter", "count", "{}"),
+        ("timer_seconds_total", "counter", "total_s", "{:.9f}"),
+        ("timer_seconds_max", "gauge", "max_s", "{:.9f}"),
+    ):
+        lines.append(f"# TYPE {prefix}_{metric} {kind}")
+        for name, t in snap["timers"].items():
+            lines.append(f'{prefix}_{metric}{{name="{_label(name)}"}} ' + fmt.format(t[key]))
+    lines.append(f"# TYPE {prefix}_events_total counter")
+    for name, n in snap["counters"].items():
+        lines.append(f'{prefix}_events_total{{name="{_label(name)}"}} {n}')
+    return "\n".join(lines) + "\n"
+
+
+_log_lock = threading.Lock()
+
+
+def write_jsonl(path: str, profile: RerunProfile) -> None:
+    import json
+
+    line = json.dumps(asdict(profile), ensure_ascii=False)
+    with _log_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+        f.write("\n")
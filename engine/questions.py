@@ -0,0 +1,107 @@
+import random
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+from .ledger import Posting
+from .marking import AnswerKey
+from .profiling import timed
+from .templates import band_for_round
+
+
+# ----------------------------
+# Questions
+# ----------------------------
+
+@dataclass(frozen=True, slots=True)
+class Question:
+    prompt: str
+    expected: List[Posting]
+    answer_key: AnswerKey = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "answer_key", AnswerKey(self.expected))
+
+
+def round_rng(round_no: int, seed: Optional[int] = None) -> random.Random:
+    # seed=None is the classic game: round N is the same for every player.
+    if seed is None:
+        return random.Random(1000 + round_no)
+    return random.Random(f"{seed}/{round_no}")
+
+
+@timed("build_round")
+def build_round(round_no: int, n: int = 10, seed: Optional[int] = None) -> List[Question]:
+    rng = round_rng(round_no, seed)
+    band = band_for_round(round_no)
+    lo, hi, step = band.amount_range
+
+    questions: List[Question] = []
+    for i in range(n):
+        template = rng.choice(band.templates)
+        x = rng.randrange(lo, hi + step, step)
+        prompt = f"Q{i+1}. " + template.format_prompt(x)
+        questions.append(Question(prompt=prompt, expected=template.build(x)))
+
+    return questions
+
+
+# ----------------------------
+# Dropdown options
+# ----------------------------
+
+def account_options_for_round(round_no: int) -> List[str]:
+    base = [
+        "Bank", "Capital", "Drawings", "Sales", "Purchases",
+        "Rent expense", "Wages expense", "Utilities expense", "Equipment",
+        "Trade receivables", "Trade payables",
+        "Sales returns", "Purchase returns",
+    ]
+    vat = ["VAT input", "VAT output"]
+    discounts = ["Discount allowed", "Discount received"]
+    adjustments = [
+        "Accruals", "Prepayments", "Depreciation expense", "Accumulated depreciation",
+        "Bad debt expense", "Allowance for doubtful debts"
+    ]
+    suspense = ["Suspense"]
+
+    if round_no <= 4:
+        return base
+    if round_no <= 8:
+        return base
+    if round_no <= 12:
+        return base + vat + discounts + ["Depreciation expense", "Accumulated depreciation"]
+    if round_no <= 16:
+        return base + vat + discounts + adjustments
+    return base + vat + discounts + adjustments + suspense
+
+
+@timed("amount_options")
+def amount_options(expected: List[Posting], rng: random.Random) -> List[int]:
+    correct = sorted(set(p.amount for p in expected))
+    distractors: List[int] = []
+    for a in correct:
+        for delta in (50, 100, 200):
+            if a - delta > 0:
+                distractors.append(a - delta)
+            distractors.append(a + delta)
+
+    if correct:
+        lo = max(50, min(correct) - 500)
+        hi = max(correct) + 500
+        for _ in range(3):
+            distractors.append(rng.randrange(lo, hi + 50, 50))
+
+    # Cap at 18 choices, but never drop a correct amount to get there.
+    spare = sorted(set(distractors) - set(correct))[: max(0, 18 - len(correct))]
+    return sorted(correct + spare)
+
+
+def round_amount_options(round_no: int, questions: Sequence[Question], seed: Optional[int] = None) -> List[List[int]]:
+    out: List[List[int]] = []
+    for i, q in enumerate(questions):
+        if seed is None:
+            rng = random.Random(5000 + round_no + i)
+        else:
+            rng = random.Random(f"{seed}/{round_no}/{i}/amounts")
+        out.append(amount_options(q.expected, rng))
+    return out
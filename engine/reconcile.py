@@ -0,0 +1,184 @@
+import functools
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import bank
+from .ledger import Cell, Columns, Ledger
+from .narratives import annotate_with_from_to
+from .profiling import timed
+
+
+# ----------------------------
+# Model-vs-student reconciliation
+# ----------------------------
+# The model ledger for a round posts every Question.expected, tagged by
+# annotate_with_from_to exactly as the game tags a posted answer ("Q3 from
+# Bank"). Any ledger is reduced in one scan to a hash map
+# (question, account) -> signed amount, debits positive. Account totals are
+# summed from that map. Comparing two ledgers is then a diff of two small
+# dicts, whatever the number of postings.
+#
+# Lines without a Qn tag (e.g. "Bal b/d" openings after a period close)
+# are kept apart as `untagged` and are not compared.
+#
+# reconcile_class makes one pass over any number of ledgers. The model
+# aggregates are cached per round. Students with the same aggregates share
+# one diff, found by hashing the aggregates.
+
+Key = Tuple[int, str]  # (question number, account)
+Aggregates = Dict[Key, int]
+
+_TAG = re.compile(r"Q(\d+)(?:\s|$)")
+
+
+@functools.lru_cache(maxsize=4096)
+def question_of(narrative: str) -> Optional[int]:
+    # Narratives are interned and repeat, so each distinct one is parsed once.
+    m = _TAG.match(narrative)
+    return int(m.group(1)) if m else None
+
+
+def aggregate(ledger: Ledger) -> Tuple[Aggregates, Dict[str, int]]:
+    tagged: Aggregates = {}
+    untagged: Dict[str, int] = {}
+    for name, acc in ledger.accounts.items():
+        for lines, sign in ((acc.debits, 1), (acc.credits, -1)):
+            for narrative, amount in lines:
+                q = question_of(narrative)
+                if q is None:
+                    untagged[name] = untagged.get(name, 0) + sign * amount
+                else:
+                    key = (q, name)
+                    tagged[key] = tagged.get(key, 0) + sign * amount
+    return tagged, {n: v for n, v in untagged.items() if v}
+
+
+def by_account(agg: Aggregates) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for (_, name), v in agg.items():
+        out[name] = out.get(name, 0) + v
+    return out
+
+
+def model_ledger(round_no: int, n: int = bank.QUESTIONS_PER_ROUND) -> Ledger:
+    ledger = Ledger()
+    for i, q in enumerate(bank.get_round(round_no, n).questions):
+        ledger.post_many(annotate_with_from_to(q.expected, i + 1))
+    return ledger
+
+
+@functools.lru_cache(maxsize=64)
+def model_aggregates(round_no: int, n: int = bank.QUESTIONS_PER_ROUND) -> Aggregates:
+    return aggregate(model_ledger(round_no, n))[0]
+
+
+@dataclass(frozen=True)
+class Divergence:
+    account: str
+    question: Optional[int]  # None in the by-account view
+    expected: int            # signed, debit positive
+    actual: int
+
+    @property
+    def difference(self) -> int:
+        return self.actual - self.expected
+
+
+@dataclass(frozen=True)
+class Reconciliation:
+    round_no: int
+    by_account: Tuple[Divergence, ...]
+    by_question: Tuple[Divergence, ...]
+    missing_questions: Tuple[int, ...]  # in the model, nothing posted for them
+    untagged: Dict[str, int]            # not compared, e.g. opening balances
+
+    @property
+    def agrees(self) -> bool:
+        return not self.by_account and not self.by_question
+
+    def columns(self) -> Columns:
+        # By-question rows for st.dataframe; amounts signed, debits positive.
+        qs: List[Cell] = []
+        names: List[Cell] = []
+        model: List[Cell] = []
+        yours: List[Cell] = []
+        diff: List[Cell] = []
+        for d in self.by_question:
+            qs.append(f"Q{d.question}")
+            names.append(d.account)
+            model.append(d.expected)
+            yours.append(d.actual)
+            diff.append(d.difference)
+        return {"Question": qs, "Account": names, "Model (£)": model, "Yours (£)": yours, "Difference (£)": diff}
+
+
+def _diff(expected: Dict, actual: Dict) -> List[Tuple[object, int, int]]:
+    out = []
+    for key in expected.keys() | actual.keys():
+        e = expected.get(key, 0)
+        a = actual.get(key, 0)
+        if e != a:
+            out.append((key, e, a))
+    out.sort(key=lambda item: item[0])
+    return out
+
+
+def _divergences(model: Aggregates, student: Aggregates) -> Tuple[Tuple[Divergence, ...], Tuple[Divergence, ...], Tuple[int, ...]]:
+    accounts = tuple(Divergence(name, None, e, a) for name, e, a in _diff(by_account(model), by_account(student)))
+    questions = tuple(Divergence(name, q, e, a) for (q, name), e, a in _diff(model, student))
+    posted = {q for q, _ in student}
+    missing = tuple(sorted({q for q, _ in model} - posted))
+    return accounts, questions, missing
+
+
+@timed("reconcile")
+def reconcile(ledger: Ledger, round_no: int, n: int = bank.QUESTIONS_PER_ROUND) -> Reconciliation:
+    student, untagged = aggregate(ledger)
+    accounts, questions, missing = _divergences(model_aggregates(round_no, n), student)
+    return Reconciliation(round_no, accounts, questions, missing, untagged)
+
+
+@dataclass(frozen=True)
+class ClassReconciliation:
+    round_no: int
+    students: Dict[str, Reconciliation]
+    agree: int
+    accounts_diverging: Dict[str, int]   # account -> students whose balance differs
+    questions_diverging: Dict[int, int]  # question -> students with any difference
+    distinct_ledgers: int                # distinct aggregates actually diffed
+
+
+@timed("reconcile_class")
+def reconcile_class(
+    round_no: int, ledgers: Iterable[Tuple[str, Ledger]], n: int = bank.QUESTIONS_PER_ROUND
+) -> ClassReconciliation:
+    # ledgers may be a generator (e.g. loading saved sessions one by one);
+    # each is aggregated once and not kept.
+    model = model_aggregates(round_no, n)
+    memo: Dict[frozenset, Tuple[Tuple[Divergence, ...], Tuple[Divergence, ...], Tuple[int, ...]]] = {}
+    students: Dict[str, Reconciliation] = {}
+    accounts: Counter = Counter()
+    questions: Counter = Counter()
+    agree = 0
+    for student_id, ledger in ledgers:
+        student, untagged = aggregate(ledger)
+        fingerprint = frozenset(student.items())
+        found = memo.get(fingerprint)
+        if found is None:
+            found = memo[fingerprint] = _divergences(model, student)
+        rec = Reconciliation(round_no, *found, untagged)
+        students[student_id] = rec
+        if rec.agrees:
+            agree += 1
+        accounts.update(d.account for d in rec.by_account)
+        questions.update({d.question for d in rec.by_question})
+    return ClassReconciliation(
+        round_no=round_no,
+        students=students,
+        agree=agree,
+        accounts_diverging=dict(accounts.most_common()),
+        questions_diverging=dict(sorted(questions.items())),
+        distinct_ledgers=len(memo),
+    )
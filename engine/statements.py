@@ -0,0 +1,150 @@
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+
+from .accounts import CLASSIFICATION, classify
+from .ledger import Cell, Columns, Posting
+
+if TYPE_CHECKING:
+    from .ledger import Ledger
+
+
+# ----------------------------
+# Financial statements (incremental)
+# ----------------------------
+# Subscribed to a Ledger, so each post_many adds its postings to per-account
+# and per-kind running balances: a refresh costs O(batch), never a rescan.
+# Rendering walks the open accounts (a few dozen) and is cached until the
+# next batch. Balances are signed, debit positive.
+
+UNCLASSIFIED = "unclassified"
+STATEMENT_COLUMNS = ("Line", "£")
+_ORDER = {name: i for i, name in enumerate(CLASSIFICATION)}
+
+
+def _kind(name: str) -> str:
+    c = classify(name)
+    return c.kind if c is not None else UNCLASSIFIED
+
+
+class FinancialStatements:
+    def __init__(self, ledger: "Ledger") -> None:
+        self.balances: Dict[str, int] = {}
+        self.kind_totals: Dict[str, int] = {}
+        self._kinds: Dict[str, str] = {}
+        self._changes = 0
+        self._cache: Dict[str, Tuple[int, Columns]] = {}
+        self.rebuilt(ledger)
+
+    # Ledger listener protocol
+    def posted(self, postings: Iterable[Posting], sign: int = 1) -> None:
+        balances = self.balances
+        totals = self.kind_totals
+        for p in postings:
+            name = p.account.strip()
+            kind = self._kinds.get(name)
+            if kind is None:
+                kind = self._kinds[name] = _kind(name)
+            signed = sign * (p.amount if p.side.upper().strip() == "DR" else -p.amount)
+            balances[name] = balances.get(name, 0) + signed
+            totals[kind] = totals.get(kind, 0) + signed
+        self._changes += 1
+
+    def reverted(self, postings: Iterable[Posting]) -> None:
+        self.posted(postings, sign=-1)
+
+    def rebuilt(self, ledger: "Ledger") -> None:
+        self.balances.clear()
+        self.kind_totals.clear()
+        for name, acc in ledger.accounts.items():
+            dr, cr = acc.totals()
+            if dr or cr:
+                kind = self._kinds.setdefault(name, _kind(name))
+                self.balances[name] = dr - cr
+                self.kind_totals[kind] = self.kind_totals.get(kind, 0) + dr - cr
+        self._changes += 1
+
+    # Headline figures, O(1)
+    def total(self, kind: str) -> int:
+        # In the kind's normal direction: assets and expenses as debits, the rest as credits.
+        signed = self.kind_totals.get(kind, 0)
+        return signed if kind in ("asset", "expense", UNCLASSIFIED) else -signed
+
+    def revenue(self) -> int:
+        return self.total("income")
+
+    def expenses(self) -> int:
+        return self.total("expense")
+
+    def profit(self) -> int:
+        return self.revenue() - self.expenses()
+
+    def net_assets(self) -> int:
+        return self.total("asset") + self.total(UNCLASSIFIED) - self.total("liability")
+
+    def equity(self) -> int:
+        return self.total("equity") + self.profit()
+
+    def balances_agree(self) -> bool:
+        return self.net_assets() == self.equity()
+
+    # Statements as columns for st.dataframe
+    def _lines(self, kind: str) -> List[Tuple[str, int]]:
+        out = []
+        for name, signed in self.balances.items():
+            if signed and self._kinds[name] == kind:
+                out.append((name, signed if kind in ("asset", "expense", UNCLASSIFIED) else -signed))
+        out.sort(key=lambda item: (_ORDER.get(item[0], len(_ORDER)), item[0]))
+        return out
+
+    def _cached(self, key: str, build) -> Columns:
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == self._changes:
+            return cached[1]
+        cols = build()
+        self._cache[key] = (self._changes, cols)
+        return cols
+
+    def income_statement(self) -> Columns:
+        return self._cached("income", self._build_income_statement)
+
+    def balance_sheet(self) -> Columns:
+        return self._cached("balance", self._build_balance_sheet)
+
+    def _build_income_statement(self) -> Columns:
+        labels: List[Cell] = []
+        amounts: List[Cell] = []
+
+        def add(label: str, amount: Cell) -> None:
+            labels.append(label)
+            amounts.append(amount)
+
+        for name, amt in self._lines("income"):
+            add(name, amt)
+        add("Total income", self.revenue())
+        for name, amt in self._lines("expense"):
+            add(name, amt)
+        add("Total expenses", self.expenses())
+        profit = self.profit()
+        add("Profit for the period" if profit >= 0 else "Loss for the period", profit)
+        return dict(zip(STATEMENT_COLUMNS, (labels, amounts)))
+
+    def _build_balance_sheet(self) -> Columns:
+        labels: List[Cell] = []
+        amounts: List[Cell] = []
+
+        def add(label: str, amount: Cell) -> None:
+            labels.append(label)
+            amounts.append(amount)
+
+        for name, amt in self._lines("asset") + self._lines(UNCLASSIFIED):
+            add(name, amt)
+        add("Total assets", self.total("asset") + self.total(UNCLASSIFIED))
+        for name, amt in self._lines("liability"):
+            add(name, amt)
+        add("Total liabilities", self.total("liability"))
+        add("Net assets", self.net_assets())
+        for name, amt in self._lines("equity"):
+            add(name, amt)
+        if self.profit():
+            add("Profit for the period" if self.profit() > 0 else "Loss for the period", self.profit())
+        add("Total equity", self.equity())
+        return dict(zip(STATEMENT_COLUMNS, (labels, amounts)))
@@ -0,0 +1,172 @@
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from .ledger import Ledger, Posting
+
+
+# ----------------------------
+# Durable session store (SQLite, WAL)
+# ----------------------------
+# Per session:
+#   sessions  - latest progress (round, question, score, messages) as JSON
+#   events    - append-only log: "start" (new round) and "post" batches
+#               a start is always snapshotted, so its opening ledger (empty,
+#               or carried-forward balances after a period close) is in snapshots
+#   snapshots - latest full ledger and the event seq it includes
+# Restore = latest snapshot + the events after it, so the replay tail is at
+# most `snapshot_every` events long whatever the session's age.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    updated REAL NOT NULL,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshots (
+    session_id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    ledger TEXT NOT NULL
+);
+"""
+
+
+@dataclass
+class RestoredSession:
+    state: Dict[str, Any]
+    ledger: Ledger
+    seq: int
+
+
+def _postings_payload(postings: Sequence[Posting]) -> str:
+    return json.dumps([[p.account, p.side, p.amount, p.narrative] for p in postings], ensure_ascii=False)
+
+
+def _postings_from_payload(payload: str) -> List[Posting]:
+    return [Posting(account=a, side=s, amount=int(v), narrative=n) for a, s, v, n in json.loads(payload)]
+
+
+class SessionStore:
+    def __init__(self, path: str, snapshot_every: int = 50) -> None:
+        self.path = path
+        self.snapshot_every = snapshot_every
+        # One connection shared by Streamlit's session threads, serialised by a lock.
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._seq: Dict[str, int] = {}
+        self._snap_seq: Dict[str, int] = {}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _last_seq(self, session_id: str) -> int:
+        seq = self._seq.get(session_id)
+        if seq is None:
+            row = self._conn.execute("SELECT MAX(seq) FROM events WHERE session_id = ?", (session_id,)).fetchone()
+            seq = row[0] or 0
+            self._seq[session_id] = seq
+        return seq
+
+    def _snapshot_seq(self, session_id: str) -> int:
+        seq = self._snap_seq.get(session_id)
+        if seq is None:
+            row = self._conn.execute("SELECT seq FROM snapshots WHERE session_id = ?", (session_id,)).fetchone()
+            seq = row[0] if row else 0
+            self._snap_seq[session_id] = seq
+        return seq
+
+    def _append(self, session_id: str, kind: str, payload: str) -> int:
+        seq = self._last_seq(session_id) + 1
+        self._conn.execute(
+            "INSERT INTO events (session_id, seq, kind, payload) VALUES (?, ?, ?, ?)",
+            (session_id, seq, kind, payload),
+        )
+        self._seq[session_id] = seq
+        return seq
+
+    def _save_state(self, session_id: str, state: Dict[str, Any]) -> None:
+        self._conn.execute(
+            "INSERT INTO sessions (id, updated, state) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET updated = excluded.updated, state = excluded.state",
+            (session_id, time.time(), json.dumps(state, ensure_ascii=False)),
+        )
+
+    def _save_snapshot(self, session_id: str, seq: int, ledger: Ledger) -> None:
+        self._conn.execute(
+            "INSERT INTO snapshots (session_id, seq, ledger) VALUES (?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET seq = excluded.seq, ledger = excluded.ledger",
+            (session_id, seq, json.dumps(ledger.to_dict(), ensure_ascii=False)),
+        )
+        self._snap_seq[session_id] = seq
+
+    def start(self, session_id: str, state: Dict[str, Any], ledger: Optional[Ledger] = None) -> None:
+        # New round: log it and snapshot the opening ledger so replay starts here.
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            seq = self._append(session_id, "start", "{}")
+            self._save_snapshot(session_id, seq, ledger if ledger is not None else Ledger())
+            self._save_state(session_id, state)
+
+    def record(
+        self,
+        session_id: str,
+        state: Dict[str, Any],
+        postings: Sequence[Posting] = (),
+        ledger: Optional[Ledger] = None,
+    ) -> None:
+        # Called on every submit: one small transaction, plus a snapshot every
+        # `snapshot_every` events when the caller passes the live ledger.
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            if postings:
+                seq = self._append(session_id, "post", _postings_payload(postings))
+                if ledger is not None and seq - self._snapshot_seq(session_id) >= self.snapshot_every:
+                    self._save_snapshot(session_id, seq, ledger)
+            self._save_state(session_id, state)
+
+    def load(self, session_id: str) -> Optional[RestoredSession]:
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            state = json.loads(row[0])
+            snap = self._conn.execute("SELECT seq, ledger FROM snapshots WHERE session_id = ?", (session_id,)).fetchone()
+            snap_seq = snap[0] if snap else 0
+            ledger = Ledger.from_dict(json.loads(snap[1])) if snap else Ledger()
+            seq = snap_seq
+            for seq, kind, payload in self._conn.execute(
+                "SELECT seq, kind, payload FROM events WHERE session_id = ? AND seq > ? ORDER BY seq",
+                (session_id, snap_seq),
+            ):
+                if kind == "start":
+                    # start() snapshots at its own seq, so a start is never
+                    # replayed. Resetting here would drop the opening
+                    # balances a period close carries into the round.
+                    raise ValueError(f"session {session_id}: start event {seq} is not snapshotted")
+                if kind == "post":
+                    ledger.post_many(_postings_from_payload(payload))
+            self._seq[session_id] = seq
+            self._snap_seq[session_id] = snap_seq
+        return RestoredSession(state=state, ledger=ledger, seq=seq)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            for table, col in (("events", "session_id"), ("snapshots", "session_id"), ("sessions", "id")):
+                self._conn.execute(f"DELETE FROM {table} WHERE {col} = ?", (session_id,))
+            self._seq.pop(session_id, None)
+            self._snap_seq.pop(session_id, None)
@@ -0,0 +1,205 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .ledger import Posting
+
+
+# ----------------------------
+# Question template registry
+# ----------------------------
+# Templates are plain data (strings and tuples), so they pickle and can be
+# dumped with dataclasses.asdict. They are compiled once, at import, into
+# CompiledTemplate builders that only look up module-level functions.
+
+A = {
+    "BANK": "Bank",
+    "CAP": "Capital",
+    "DRAW": "Drawings",
+    "SALES": "Sales",
+    "PUR": "Purchases",
+    "RENT": "Rent expense",
+    "WAGES": "Wages expense",
+    "UTIL": "Utilities expense",
+    "EQUIP": "Equipment",
+    "AR": "Trade receivables",
+    "AP": "Trade payables",
+    "RET_IN": "Sales returns",
+    "RET_OUT": "Purchase returns",
+    "VAT_IN": "VAT input",
+    "VAT_OUT": "VAT output",
+    "DISC_REC": "Discount received",
+    "DISC_ALL": "Discount allowed",
+    "DEP": "Depreciation expense",
+    "ACCDEP": "Accumulated depreciation",
+    "BAD": "Bad debt expense",
+    "ALLOW": "Allowance for doubtful debts",
+    "ACCR": "Accruals",
+    "PREP": "Prepayments",
+    "SUSP": "Suspense",
+}
+
+VAT_RATE = 20
+
+
+def _x(x: int) -> int:
+    return x
+
+
+def _vat(x: int) -> int:
+    return (x * VAT_RATE) // 100
+
+
+def _gross(x: int) -> int:
+    return x + _vat(x)
+
+
+def _disc(x: int) -> int:
+    return max(50, x // 10)
+
+
+def _x_plus_disc(x: int) -> int:
+    return x + _disc(x)
+
+
+# Amount formulas a template line may use; x is the drawn amount.
+FORMULAS: Dict[str, Callable[[int], int]] = {
+    "x": _x,
+    "net": _x,
+    "vat": _vat,
+    "gross": _gross,
+    "disc": _disc,
+    "x+disc": _x_plus_disc,
+}
+
+
+@dataclass(frozen=True)
+class Line:
+    account: str  # key into A
+    side: str     # "DR" or "CR"
+    amount: str   # key into FORMULAS
+
+
+@dataclass(frozen=True)
+class Template:
+    prompt: str  # may use {x} and {d} (the discount)
+    lines: Tuple[Line, ...]
+
+
+@dataclass(frozen=True)
+class Band:
+    max_round: Optional[int]  # None for the last band
+    amount_range: Tuple[int, int, int]  # lo, hi, step (hi inclusive)
+    templates: Tuple[Template, ...]
+
+
+def _t(prompt: str, *lines: Tuple[str, str, str]) -> Template:
+    return Template(prompt=prompt, lines=tuple(Line(a, s, f) for a, s, f in lines))
+
+
+BANDS: Tuple[Band, ...] = (
+    Band(4, (200, 3000, 100), (
+        _t("Owner introduced funds into the business £{x}.",
+           ("BANK", "DR", "x"), ("CAP", "CR", "x")),
+        _t("Paid rent from bank £{x}.",
+           ("RENT", "DR", "x"), ("BANK", "CR", "x")),
+        _t("Paid wages from bank £{x}.",
+           ("WAGES", "DR", "x"), ("BANK", "CR", "x")),
+        _t("Bought equipment and paid immediately by bank £{x}.",
+           ("EQUIP", "DR", "x"), ("BANK", "CR", "x")),
+        _t("Made a sale and received the money in bank £{x}.",
+           ("BANK", "DR", "x"), ("SALES", "CR", "x")),
+    )),
+    Band(8, (300, 6000, 100), (
+        _t("Sold goods on credit £{x}.",
+           ("AR", "DR", "x"), ("SALES", "CR", "x")),
+        _t("Bought goods on credit £{x}.",
+           ("PUR", "DR", "x"), ("AP", "CR", "x")),
+        _t("Customer returned goods worth £{x}.",
+           ("RET_IN", "DR", "x"), ("AR", "CR", "x")),
+        _t("Returned goods to supplier worth £{x}.",
+           ("AP", "DR", "x"), ("RET_OUT", "CR", "x")),
+        _t("Received money from a customer into bank £{x}.",
+           ("BANK", "DR", "x"), ("AR", "CR", "x")),
+        _t("Paid a supplier from bank £{x}.",
+           ("AP", "DR", "x"), ("BANK", "CR", "x")),
+    )),
+    Band(12, (500, 10000, 100), (
+        _t("Bought utilities, net £{x} plus VAT 20%, paid by bank.",
+           ("UTIL", "DR", "net"), ("VAT_IN", "DR", "vat"), ("BANK", "CR", "gross")),
+        _t("Made a credit sale, net £{x} plus VAT 20%.",
+           ("AR", "DR", "gross"), ("SALES", "CR", "net"), ("VAT_OUT", "CR", "vat")),
+        _t("Bought goods on credit, net £{x} plus VAT 20%.",
+           ("PUR", "DR", "net"), ("VAT_IN", "DR", "vat"), ("AP", "CR", "gross")),
+        _t("Record depreciation for the period £{x}.",
+           ("DEP", "DR", "x"), ("ACCDEP", "CR", "x")),
+        _t("Allowed a customer discount £{x}.",
+           ("DISC_ALL", "DR", "x"), ("AR", "CR", "x")),
+        _t("Received a supplier discount £{x}.",
+           ("AP", "DR", "x"), ("DISC_REC", "CR", "x")),
+    )),
+    Band(16, (200, 8000, 100), (
+        _t("At period end, rent of £{x} is owing (accrual).",
+           ("RENT", "DR", "x"), ("ACCR", "CR", "x")),
+        _t("At period end, utilities of £{x} were paid in advance (prepayment).",
+           ("PREP", "DR", "x"), ("UTIL", "CR", "x")),
+        _t("Write off an irrecoverable debt £{x}.",
+           ("BAD", "DR", "x"), ("AR", "CR", "x")),
+        _t("Create an allowance for doubtful debts £{x}.",
+           ("BAD", "DR", "x"), ("ALLOW", "CR", "x")),
+        _t("Owner took drawings £{x} from bank.",
+           ("DRAW", "DR", "x"), ("BANK", "CR", "x")),
+    )),
+    Band(None, (500, 12000, 100), (
+        _t("Correct this error: equipment £{x} was wrongly debited to purchases.",
+           ("EQUIP", "DR", "x"), ("PUR", "CR", "x")),
+        _t("A one sided error: bank was credited £{x} but the debit entry was missing. Use suspense.",
+           ("SUSP", "DR", "x"), ("BANK", "CR", "x")),
+        _t("Clear suspense: the missing debit was rent expense £{x}.",
+           ("RENT", "DR", "x"), ("SUSP", "CR", "x")),
+        _t("Customer pays £{x} and we allow a discount of £{d}.",
+           ("BANK", "DR", "x"), ("DISC_ALL", "DR", "disc"), ("AR", "CR", "x+disc")),
+        _t("We pay a supplier £{x} and receive a discount of £{d}.",
+           ("AP", "DR", "x+disc"), ("BANK", "CR", "x"), ("DISC_REC", "CR", "disc")),
+    )),
+)
+
+
+# ----------------------------
+# Compiled builders
+# ----------------------------
+
+class CompiledTemplate:
+    __slots__ = ("prompt", "lines")
+
+    def __init__(self, template: Template) -> None:
+        self.prompt = template.prompt
+        self.lines = tuple((A[ln.account], ln.side, FORMULAS[ln.amount]) for ln in template.lines)
+
+    def format_prompt(self, x: int) -> str:
+        return self.prompt.format(x=x, d=_disc(x))
+
+    def build(self, x: int) -> List[Posting]:
+        return [Posting(account=a, side=s, amount=f(x), narrative="") for a, s, f in self.lines]
+
+
+class CompiledBand:
+    __slots__ = ("max_round", "amount_range", "templates")
+
+    def __init__(self, band: Band) -> None:
+        self.max_round = band.max_round
+        self.amount_range = band.amount_range
+        self.templates = tuple(CompiledTemplate(t) for t in band.templates)
+
+
+def compile_bands(bands: Tuple[Band, ...]) -> Tuple[CompiledBand, ...]:
+    return tuple(CompiledBand(b) for b in bands)
+
+
+COMPILED_BANDS = compile_bands(BANDS)
+
+
+def band_for_round(round_no: int, bands: Tuple[CompiledBand, ...] = COMPILED_BANDS) -> CompiledBand:
+    for b in bands:
+        if b.max_round is None or round_no <= b.max_round:
+            return b
+    return bands[-1]
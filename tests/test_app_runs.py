@@ -0,0 +1,123 @@
+import functools
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from engine import bank, profiling  # noqa: E402
+
+
+# ----------------------------
+# Script runs per action
+# ----------------------------
+# Every button acts in an on_click callback, so each click must run app.py
+# top to bottom exactly once (the "script.run" counter). Dropdown picks must
+# not run it at all: the dropdowns have to be built inside the editor
+# fragment so a browser reruns only that. AppTest reruns the whole app for
+# any widget, so for picks the test checks where the dropdowns are built.
+
+APP = str(ROOT / "app.py")
+ROUND = 1
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("GAME_DB", str(tmp_path / "game.db"))
+    monkeypatch.setenv("GAME_ARCHIVE_DIR", str(tmp_path / "archive"))
+    was = profiling.ENABLED
+    profiling.enable()
+    yield AppTest.from_file(APP, default_timeout=60)
+    profiling.enable(was)
+
+
+def _runs() -> int:
+    return profiling.snapshot()["counters"].get("script.run", 0)
+
+
+def _button(at: AppTest, label: str):
+    return next(b for b in at.button if b.label == label)
+
+
+def _enter(at: AppTest, q_index: int, flip: bool) -> None:
+    expected = bank.get_round(ROUND).questions[q_index].expected
+    while at.session_state["lines"] < len(expected):
+        _button(at, "Add a line").click().run()
+    for i, p in enumerate(expected):
+        side = ("CR" if p.side == "DR" else "DR") if flip else p.side
+        at.selectbox(key=f"side_{ROUND}_{q_index}_{i}").set_value(side)
+        at.selectbox(key=f"acct_{ROUND}_{q_index}_{i}").set_value(p.account)
+        at.selectbox(key=f"amt_{ROUND}_{q_index}_{i}").set_value(p.amount)
+    at.run()
+
+
+def _once(at: AppTest, act) -> int:
+    before = _runs()
+    act()
+    assert not at.exception, at.exception[0].message
+    return _runs() - before
+
+
+def test_each_button_runs_the_script_once(app):
+    at = app
+    assert _once(at, at.run) == 1
+
+    at.sidebar.selectbox[0].select(ROUND).run()
+    assert _once(at, lambda: _button(at, "Start new round").click().run()) == 1
+
+    _enter(at, 0, flip=True)
+    assert _once(at, lambda: _button(at, "Submit entry").click().run()) == 1
+    assert (at.session_state["attempts"], at.session_state["q_index"]) == (1, 0)
+
+    _enter(at, 0, flip=False)
+    assert _once(at, lambda: _button(at, "Submit entry").click().run()) == 1
+    assert (at.session_state["score"], at.session_state["q_index"]) == (1, 1)
+
+    assert _once(at, lambda: _button(at, "Show model answer and post it").click().run()) == 1
+    assert (at.session_state["score"], at.session_state["q_index"]) == (1, 2)
+
+
+def test_dropdowns_are_built_inside_the_editor_fragment(app, monkeypatch):
+    # Wraps st.fragment so each fragment body records its name while it
+    # runs, and st.selectbox so each box records the fragment it is in.
+    running: List[str] = []
+    built_in: Dict[str, Optional[str]] = {}
+    fragment, selectbox = st.fragment, st.selectbox
+
+    def recording_fragment(func=None, **kwargs):
+        if func is None:
+            return lambda f: recording_fragment(f, **kwargs)
+
+        @functools.wraps(func)
+        def body(*args, **kw):
+            running.append(func.__name__)
+            try:
+                return func(*args, **kw)
+            finally:
+                running.pop()
+
+        return fragment(body, **kwargs)
+
+    def recording_selectbox(label, *args, key=None, **kwargs):
+        built_in[key] = running[-1] if running else None
+        return selectbox(label, *args, key=key, **kwargs)
+
+    monkeypatch.setattr(st, "fragment", recording_fragment)
+    monkeypatch.setattr(st, "selectbox", recording_selectbox)
+
+    at = app
+    at.run()
+    at.sidebar.selectbox[0].select(ROUND).run()
+    _button(at, "Start new round").click().run()
+    assert not at.exception
+
+    picks = {k: v for k, v in built_in.items() if k and k.startswith(("side_", "acct_", "amt_"))}
+    assert len(picks) == 3 * at.session_state["lines"]
+    assert set(picks.values()) == {"dropdown_lines"}
+    # The round picker is outside every fragment, so the recorder can tell.
+    assert None in built_in.values()
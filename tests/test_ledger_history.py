@@ -0,0 +1,161 @@
+import itertools
+import random
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from engine import Ledger, Posting  # noqa: E402
+from engine import ledger as ledger_module  # noqa: E402
+
+
+# ----------------------------
+# Undo, redo, restore and preview
+# ----------------------------
+# Random balanced batches are posted, undone, redone, restored to earlier
+# snapshots and previewed. After every step the ledger must match a fresh
+# ledger built from the batches that should be live: same lines, trial
+# balance, T accounts and statements (kept incrementally by listeners),
+# with version and the render caches telling the truth.
+
+ACCOUNTS = ["Bank", "Sales", "Purchases", "Capital", "Rent", "Equipment", "Trade receivables", "Drawings", "Loan"]
+
+Batch = Tuple[int, List[Posting]]  # (id, postings)
+
+
+def _batch(rng: random.Random, n: int) -> List[Posting]:
+    out: List[Posting] = []
+    for _ in range(rng.randint(1, 3)):
+        dr, cr = rng.sample(ACCOUNTS, 2)
+        amount = rng.randrange(50, 5000, 50)
+        # Padded names must land on the same account, as in Ledger.get.
+        out.append(Posting(f" {dr}" if rng.random() < 0.1 else dr, "DR", amount, f"B{n}"))
+        out.append(Posting(cr, "CR", amount, f"B{n}"))
+    return out
+
+
+def _lines(led: Ledger):
+    return {name: (a.debits, a.credits) for name, a in led.accounts.items() if a.debits or a.credits}
+
+
+def _assert_matches(led: Ledger, batches: List[List[Posting]]) -> None:
+    ref = Ledger()
+    for postings in batches:
+        ref.post_many(postings)
+    assert _lines(led) == _lines(ref)
+    assert led.used_account_names() == ref.used_account_names()
+    assert led.trial_balance_rows() == ref.trial_balance_rows()
+    for name in ref.used_account_names():
+        assert led.t_account_table_rows(name) == ref.t_account_table_rows(name)
+    fs, ref_fs = led.statements(), ref.statements()
+    assert fs.income_statement() == ref_fs.income_statement()
+    assert fs.balance_sheet() == ref_fs.balance_sheet()
+    for acc in led.accounts.values():
+        acc.check_totals()
+
+
+class Model:
+    # What the ledger should hold: live batches, the redo stack, and how many
+    # of the newest live batches undo can still reach.
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.live: List[Batch] = []
+        self.redo: List[Batch] = []
+        self.undoable = 0
+
+    def post(self, batch: Batch) -> None:
+        self.live.append(batch)
+        self.redo.clear()
+        self.undoable = min(self.undoable + 1, self.limit)
+
+    def undo(self) -> bool:
+        if not self.undoable:
+            return False
+        self.redo.append(self.live.pop())
+        self.undoable -= 1
+        return True
+
+    def redo_one(self) -> bool:
+        if not self.redo:
+            return False
+        self.live.append(self.redo.pop())
+        self.undoable = min(self.undoable + 1, self.limit)
+        return True
+
+    def reachable(self, ids: Tuple[int, ...]) -> bool:
+        live = tuple(i for i, _ in self.live)
+        return live[:len(ids)] == ids and len(live) - len(ids) <= self.undoable
+
+    def postings(self) -> List[List[Posting]]:
+        return [p for _, p in self.live]
+
+
+def _play(seed: int, steps: int, limit: int) -> None:
+    rng = random.Random(seed)
+    led = Ledger()
+    led.statements()  # kept current by listeners from here on
+    model = Model(limit)
+    ids = itertools.count()
+    snapshots = []
+    for _ in range(steps):
+        op = rng.choices(["post", "undo", "redo", "snapshot", "restore", "preview"], [5, 2, 1, 1, 1, 2])[0]
+        version = led.version
+        if op == "post":
+            n = next(ids)
+            postings = _batch(rng, n)
+            led.post_many(postings)
+            model.post((n, postings))
+            assert led.version > version
+        elif op == "undo":
+            undone = led.undo()
+            assert bool(undone) == model.undo()
+            assert (led.version > version) == bool(undone)
+        elif op == "redo":
+            redone = led.redo()
+            assert bool(redone) == model.redo_one()
+        elif op == "snapshot":
+            snapshots.append((led.snapshot(), tuple(i for i, _ in model.live)))
+        elif op == "restore" and snapshots:
+            snap, snap_ids = rng.choice(snapshots)
+            if model.reachable(snap_ids):
+                assert led.restore(snap) == len(model.live) - len(snap_ids)
+                while len(model.live) > len(snap_ids):
+                    model.undo()
+            else:
+                with pytest.raises(ValueError):
+                    led.restore(snap)
+        elif op == "preview":
+            draft = _batch(rng, -1)
+            history, redo = len(led._history), list(led._redo)
+            tb = led.trial_balance_rows()
+            with led.preview(draft):
+                ref = Ledger()
+                for postings in model.postings() + [draft]:
+                    ref.post_many(postings)
+                assert _lines(led) == _lines(ref)
+                assert led.trial_balance_rows() == ref.trial_balance_rows()
+                for name in {p.account.strip() for p in draft}:
+                    assert led.t_account_table_rows(name) == ref.t_account_table_rows(name)
+                assert led.version == version
+            assert (led.version, len(led._history), led._redo) == (version, history, redo)
+            assert led.trial_balance_rows() == tb
+        assert led.can_undo() == bool(model.undoable)
+        assert led.can_redo() == bool(model.redo)
+        _assert_matches(led, model.postings())
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_random_batches(seed):
+    # About 60 batches posted per run, with undo, redo, restore and preview between them.
+    _play(seed=seed, steps=150, limit=ledger_module.HISTORY_LIMIT)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_history_limit_moves_the_floor(seed, monkeypatch):
+    monkeypatch.setattr(ledger_module, "HISTORY_LIMIT", 6)
+    _play(seed=seed, steps=150, limit=6)
+